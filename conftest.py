@@ -0,0 +1 @@
+# Makes the `python` package importable from the tests
@@ -1,3 +1,3 @@
 from . import poseidon
 from . import poseidonmax
-from .params import import_parameters, import_parameters_as_le
+from .params import import_parameters, import_parameters_as_le, load_parameters
@@ -0,0 +1,111 @@
+"""Lowest gas program whose runtime code fits in a size budget
+
+The search covers the variants, the options each generator declares in
+the KNOBS of its module, and whether the peephole optimizer runs.
+Candidates are compiled through the build cache and costed statically,
+then the winner is checked against the interpreter.
+"""
+import argparse
+import itertools
+import json
+import sys
+from typing import NamedTuple
+
+from .benchmark import calldata, variants
+from .cache import BuildCache, Build, build
+from .evm import Interpreter, MAX_CODE_SIZE
+from .evm.optimizer import rules as all_rules
+from .params import load_parameters
+
+
+class Candidate(NamedTuple):
+    implementation: str
+    options: dict
+    rules: tuple
+
+
+def knobs(generator):
+    return getattr(sys.modules[generator.__module__], "KNOBS", {})
+
+
+def candidates(names=None, peephole=(False, True)):
+    names = names or [k for k, v in variants.items() if v is not None]
+    for name in names:
+        k = knobs(variants[name])
+        for values in itertools.product(*k.values()):
+            for p in peephole:
+                yield Candidate(name, dict(zip(k, values)),
+                                all_rules if p else ())
+
+
+def _gas(b: Build, params):
+    if b.gas is not None:
+        return b.gas["total"]
+    return Interpreter(b.code).run(calldata(params)).gas
+
+
+def tune(params, budget=MAX_CODE_SIZE, names=None, peephole=(False, True),
+         cache=None, log=None):
+    """(candidate, build, gas) of the lowest gas program within budget,
+    ties going to the smallest code, None if nothing fits"""
+    best = None
+    for c in candidates(names, peephole):
+        try:
+            b = build(variants[c.implementation], params, c.rules, cache,
+                      **c.options)
+        except ValueError as e:
+            if log:
+                print(f"{c}: {e}", file=log)
+            continue
+        gas = _gas(b, params) if b.code_size <= budget else None
+        if log:
+            print(f"{c.implementation} {c.options} rules={bool(c.rules)} "
+                  f"size={b.code_size} gas={gas}", file=log)
+        if gas is None:
+            continue
+        if best is None or (gas, b.code_size) < (best[2], best[1].code_size):
+            best = (c, b, gas)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--params", default="params/sw2mont.json")
+    parser.add_argument("--budget", type=int, default=MAX_CODE_SIZE,
+                        help="maximum runtime code size, in bytes")
+    parser.add_argument("--variants", nargs="*", default=None)
+    parser.add_argument("--no-peephole", action="store_true")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--out", help="write the winning runtime code here")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    params = load_parameters(args.params)
+    peephole = (False,) if args.no_peephole else (False, True)
+    cache = None if args.no_cache else BuildCache()
+    best = tune(params, args.budget, args.variants, peephole, cache,
+                sys.stderr if args.verbose else None)
+    if best is None:
+        print(f"No program fits in {args.budget} bytes", file=sys.stderr)
+        return 1
+
+    c, b, gas = best
+    result = Interpreter(b.code).run(calldata(params))
+    if result.gas != gas:
+        print(f"Static gas {gas} differs from executed gas {result.gas}",
+              file=sys.stderr)
+    print(json.dumps({
+        "implementation": c.implementation,
+        "options": c.options,
+        "rules": list(c.rules),
+        "code_size": b.code_size,
+        "gas": result.gas,
+    }, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(b.code.hex() + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
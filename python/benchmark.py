@@ -0,0 +1,270 @@
+import argparse
+import inspect
+import json
+import sys
+import time
+
+from . import poseidon, poseidon_unwind, poseidonmax, poseidonmax_unwind
+from . import poseidon_cst_unwind, poseidon_stack_unwind
+from .cache import BuildCache, build
+from .evm import Interpreter, MAX_CODE_SIZE
+from .params import load_parameters
+
+
+# Implementation name -> program generator, in README order.
+# Implementations without a generator are listed with None.
+variants = {
+    "std-cst-unwind": poseidon_cst_unwind.program,
+    "std-mem-unwind": poseidon_unwind.program,
+    "std-stack-unwind": poseidon_stack_unwind.program,
+    "std-mem-func": poseidon.program,
+    "max-unwind": poseidonmax_unwind.program,
+    "max-func": poseidonmax.program,
+    "rs": None,
+}
+
+# Fields compared against the baseline: any increase is a regression
+TRACKED = ("code_size", "gas", "n_ops")
+PROFILED = ("MSTORE", "MLOAD", "PUSH", "DUP", "SWAP")
+
+
+def calldata(params, n=1):
+    """Inputs 1, 2, ... of n hashes, packed"""
+    return b"".join((i + 1).to_bytes(32, "big")
+                    for i in range(n * params["rate"]))
+
+
+def batch_costs(name, generator, params, n=8, **options):
+    """Fixed and per-hash gas of the batch program, the per-hash gas being
+    the average marginal gas of hashes 2 to n"""
+    interpreter = Interpreter(generator(params, batch=True, **options)
+                              .assemble())
+    one = interpreter.run(calldata(params)).gas
+    per_hash = round((interpreter.run(calldata(params, n)).gas - one)
+                     / (n - 1))
+    return {"implementation": name, "options": options,
+            "fixed_gas": one - per_hash, "per_hash_gas": per_hash,
+            "single_gas": one}
+
+
+def merkle_costs(name, generator, params, depths, **options):
+    """Gas of the Merkle root of rate^d leaves, for each depth d"""
+    interpreter = Interpreter(generator(params, merkle=True, **options)
+                              .assemble())
+    results = []
+    for d in depths:
+        n = params["rate"] ** d
+        gas = interpreter.run(calldata(params, n // params["rate"])).gas
+        results.append({"implementation": name, "options": options,
+                        "depth": d, "leaves": n, "gas": gas,
+                        "gas_per_leaf": round(gas / n)})
+    return results
+
+
+def accepts(generator, option):
+    """Whether the generator, None for a variant without one, takes option"""
+    return (generator is not None
+            and option in inspect.signature(generator).parameters)
+
+
+def measure(name, generator, params, repeat=5, cache=None, **options):
+    t = time.perf_counter()
+    if cache is None:
+        code = generator(params, **options).assemble()
+    else:
+        code = build(generator, params, cache=cache, **options).code
+    generation = time.perf_counter() - t
+
+    interpreter = Interpreter(code)
+    data = calldata(params)
+    execution = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = interpreter.run(data)
+        execution = min(execution, time.perf_counter() - t)
+
+    return {
+        "variant": f"Poseidon{params['rate']}",
+        "implementation": name,
+        "options": options,
+        "code_size": len(code),
+        "deployable": len(code) <= MAX_CODE_SIZE,
+        "n_ops": result.n_ops,
+        "gas": result.gas,
+        "generation_ms": round(1e3 * generation, 3),
+        "execution_ms": round(1e3 * execution, 3),
+        "counts": result.counts,
+        "by_op": result.by_op,
+        "output": result.output.hex(),
+    }
+
+
+def run(params, names=None, repeat=5, cache=None, **options):
+    """Measure the variants, each with the options its generator accepts"""
+    names = names or [k for k, v in variants.items() if v is not None]
+    return [measure(name, variants[name], params, repeat, cache,
+                    **{k: v for k, v in options.items()
+                       if accepts(variants[name], k)})
+            for name in names]
+
+
+def fmt(x):
+    """Number with ' as thousands separator, as in the README tables"""
+    return "" if x is None else f"{x:,}".replace(",", "'")
+
+
+def markdown(results, variant="Poseidon2"):
+    by_name = {r["implementation"]: r for r in results}
+    w = max(len("Implementation"), *(len(name) for name in variants))
+    lines = [
+        f"| Variant   | {'Implementation':<{w}} | CodeSize (B) | Timing (ms) | GasCost | N-ops |",
+        f"|:----------|:{'-' * (w + 1)}|:------------:|:-----------:|:-------:|:-----:|",
+    ]
+    for name in variants:
+        r = by_name.get(name)
+        if r is None:
+            lines.append(f"| {variant} | {name:<{w}} |              |             |         |       |")
+            continue
+        # Flag code that cannot be deployed (EIP-170)
+        mark = " " if r["deployable"] else "*"
+        lines.append(
+            f"| {r['variant']} | {name:<{w}} | {fmt(r['code_size']):>10}{mark}  "
+            f"| {r['execution_ms']:>9.3f}   | {fmt(r['gas']):>7} "
+            f"| {fmt(r['n_ops']):>5} |")
+    if not all(r["deployable"] for r in results):
+        lines.append(f"\n\\* over the EIP-170 limit of "
+                     f"{fmt(MAX_CODE_SIZE)} bytes")
+
+    lines += [
+        "",
+        f"| Variant   | {'Implementation':<{w}} | MSTORE | MLOAD | PUSH |  DUP | SWAP | GasCost |",
+        f"|:----------|:{'-' * (w + 1)}|:------:|:-----:|:----:|:----:|:----:|:-------:|",
+    ]
+    for name in variants:
+        r = by_name.get(name)
+        if r is None:
+            lines.append(f"| {variant} | {name:<{w}} |        |       |      |      |      |         |")
+            continue
+        counts = [fmt(r["counts"].get(op, 0)) for op in PROFILED]
+        gas = sum(r["by_op"].get(op, 0) for op in PROFILED)
+        lines.append(
+            f"| {r['variant']} | {name:<{w}} | {counts[0]:>5}  | {counts[1]:>5} "
+            f"| {counts[2]:>4} | {counts[3]:>4} | {counts[4]:>4} "
+            f"| {fmt(gas):>7} |")
+    return "\n".join(lines)
+
+
+def compare(results, baseline):
+    """Return the list of regressions against baseline, as messages
+
+    Only runs with default generator options are tracked.
+    """
+    regressions = []
+    for r in results:
+        ref = baseline.get(r["implementation"])
+        if ref is None or r["options"]:
+            continue
+        for field in TRACKED:
+            if r[field] > ref[field]:
+                regressions.append(
+                    f"{r['implementation']}: {field} regressed "
+                    f"from {ref[field]} to {r[field]}")
+    return regressions
+
+
+def to_baseline(results):
+    return {r["implementation"]: {f: r[f] for f in TRACKED}
+            for r in results if not r["options"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Poseidon bytecode variants")
+    parser.add_argument("--params", default="params/sw2mont.json",
+                        help="JSON or binary parameter file")
+    parser.add_argument("--variants", nargs="*", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sparse", action="store_true",
+                        help="sparse MDS matrices in partial rounds")
+    parser.add_argument("--rounds-per-call", type=int, metavar="K",
+                        help="run K rounds per call in the func variants")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse compiled code across runs")
+    parser.add_argument("--batch", type=int, metavar="N",
+                        help="report the fixed and per-hash gas of the "
+                             "batch programs, hashing N inputs")
+    parser.add_argument("--merkle", type=int, metavar="D",
+                        help="report the gas per leaf of the Merkle root "
+                             "programs, for depths 1 to D")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--markdown", action="store_true",
+                        help="print the README tables")
+    parser.add_argument("--baseline", help="fail on regressions against it")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    params = load_parameters(args.params)
+    options = {"sparse": True} if args.sparse else {}
+    if args.rounds_per_call:
+        options["rounds_per_call"] = args.rounds_per_call
+    cache = BuildCache() if args.cache else None
+    w = max(len(name) for name in variants)
+    if args.batch:
+        names = args.variants or list(variants)
+        for name in names:
+            generator = variants[name]
+            if not accepts(generator, "batch"):
+                continue
+            r = batch_costs(name, generator, params, args.batch, **options)
+            print(f"{name:<{w}} fixed={r['fixed_gas']:<7} "
+                  f"per_hash={r['per_hash_gas']:<7} "
+                  f"single={r['single_gas']}")
+        return 0
+    if args.merkle:
+        names = args.variants or list(variants)
+        for name in names:
+            generator = variants[name]
+            if not accepts(generator, "merkle"):
+                continue
+            for r in merkle_costs(name, generator, params,
+                                  range(1, args.merkle + 1), **options):
+                print(f"{name:<{w}} depth={r['depth']:<3} "
+                      f"leaves={r['leaves']:<6} gas={r['gas']:<9} "
+                      f"per_leaf={r['gas_per_leaf']}")
+        return 0
+    results = run(params, args.variants, args.repeat, cache, **options)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.markdown:
+        print(markdown(results, f"Poseidon{params['rate']}"))
+    else:
+        for r in results:
+            size = f"{r['code_size']}" + ("" if r["deployable"] else "*")
+            print(f"{r['implementation']:<{w}} size={size:<6} "
+                  f"gas={r['gas']:<7} ops={r['n_ops']:<6} "
+                  f"gen={r['generation_ms']}ms exec={r['execution_ms']}ms")
+
+    if args.baseline and args.update_baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            baseline = {}
+        baseline.update(to_baseline(results))
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print("\n".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
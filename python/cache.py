@@ -0,0 +1,151 @@
+"""On-disk cache of compiled variants
+
+Entries are keyed by a hash of the parameters, the generator and its
+options, the optimizer rules and the sources of this package, so that any
+code change invalidates them. Each entry holds the runtime code and its
+static gas report. The least recently used entries are evicted once the
+cache grows over its size limit.
+"""
+from dataclasses import asdict, dataclass
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .evm import gas, optimizer
+
+# Bump when the layout of entries changes
+VERSION = 1
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "builds"
+MAX_BYTES = 256 << 20
+
+
+@dataclass
+class Build:
+    code: bytes
+    gas: Optional[dict]  # GasReport fields, None if it cannot be estimated
+    optimized: Optional[dict] = None  # bytes and gas saved per rule
+
+    @property
+    def code_size(self):
+        return len(self.code)
+
+
+@functools.lru_cache(maxsize=None)
+def source_digest() -> str:
+    """Hash of the sources of the generators and the EVM toolchain"""
+    h = hashlib.sha256()
+    root = Path(__file__).resolve().parent
+    for path in sorted(root.rglob("*.py")):
+        h.update(str(path.relative_to(root)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def params_digest(params) -> str:
+    """Hash of parameters as loaded from JSON or binary files"""
+    h = hashlib.sha256()
+    for k in sorted(params):
+        v = params[k]
+        if k in ("mds", "rks"):
+            v = [[int(x) for x in row] for row in v]
+        elif isinstance(v, int):
+            v = int(v)
+        h.update(json.dumps([k, v]).encode())
+    return h.hexdigest()
+
+
+def build_key(generator, params, rules=(), **options) -> str:
+    spec = {
+        "version": VERSION,
+        "source": source_digest(),
+        "generator": f"{generator.__module__}.{generator.__qualname__}",
+        "params": params_digest(params),
+        "options": options,
+        "rules": list(rules),
+    }
+    key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    return key.hexdigest()[:32]
+
+
+class BuildCache:
+    """Entries are a .bin file of code and a .json file of metadata"""
+    def __init__(self, path=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+
+    def get(self, key) -> Optional[Build]:
+        code_path = self.path / f"{key}.bin"
+        try:
+            code = code_path.read_bytes()
+            with open(self.path / f"{key}.json") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if len(code) != meta["code_size"]:
+            return None
+        # Mark as recently used
+        os.utime(code_path)
+        return Build(code, meta["gas"], meta["optimized"])
+
+    def put(self, key, build: Build):
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta = {"code_size": build.code_size, "gas": build.gas,
+                "optimized": build.optimized}
+        # Metadata first: an entry is complete once its code is in place
+        for suffix, data in ((".json", json.dumps(meta).encode()),
+                             (".bin", build.code)):
+            tmp = self.path / f"{key}.{os.getpid()}.tmp"
+            tmp.write_bytes(data)
+            os.replace(tmp, self.path / f"{key}{suffix}")
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries down to max_bytes"""
+        entries = []
+        total = 0
+        for code_path in self.path.glob("*.bin"):
+            meta_path = code_path.with_suffix(".json")
+            try:
+                stat = code_path.stat()
+                size = stat.st_size + meta_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, size, code_path, meta_path))
+            total += size
+        for _, size, code_path, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (code_path, meta_path):
+                path.unlink(missing_ok=True)
+            total -= size
+
+
+def build(generator, params, rules=(), cache: BuildCache = None, **options
+          ) -> Build:
+    """Compile generator(params, **options), optimized with `rules`
+
+    With a cache, an existing entry skips code generation entirely.
+    """
+    key = build_key(generator, params, rules, **options)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    program = generator(params, **options)
+    stats = None
+    if rules:
+        stats = {k: asdict(v) for k, v in
+                 optimizer.optimize(program, enabled=rules).items()}
+    try:
+        report = asdict(gas.estimate(program))
+    except ValueError:
+        report = None
+    result = Build(program.assemble(), report, stats)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
@@ -1,4 +1,7 @@
 from . import bytecode
+from . import gas
 from . import ops
-from .program import Program
-from .types import Hex
+from .interpreter import Interpreter
+from .memory import LivenessAllocator
+from .program import Program, MAX_CODE_SIZE
+from .types import Hex, Label
@@ -1,7 +1,13 @@
 from collections.abc import Iterator, Iterable
+from typing import Tuple, Union
 
 from .ops import ops_by_code, ops_by_name
 from .ops import Op
+from .types import Hex, Label
+
+
+opcodes = {code: int(code, 16) for code in ops_by_code}
+ops_by_byte = {opcodes[code]: op for code, op in ops_by_code.items()}
 
 
 def iter_bytes(hexstring: str) -> Iterator[str]:
@@ -9,25 +15,100 @@ def iter_bytes(hexstring: str) -> Iterator[str]:
         yield hexstring[i:(i+2)]
 
 
+def link(ops: Iterable[Op]) -> list:
+    """Ops with labels replaced by their code offsets
+
+    A JUMPDEST whose argument is a label defines it, a PUSH of a label
+    refers to it. Each reference gets the smallest PUSH for its target:
+    widths start at one byte and grow until offsets are stable.
+    """
+    ops = list(ops)
+    refs = {i: 1 for i, op in enumerate(ops)
+            if op.arg_nbytes and isinstance(op.arg, Label)}
+    if not refs:
+        return [ops_by_name["JUMPDEST"] if isinstance(op.arg, Label) else op
+                for op in ops]
+    while True:
+        offsets = {}
+        pc = 0
+        for i, op in enumerate(ops):
+            if isinstance(op.arg, Label) and op.name == "JUMPDEST":
+                if op.arg in offsets:
+                    raise ValueError(f"Label {op.arg.name} defined twice")
+                offsets[op.arg] = pc
+            pc += 1 + refs.get(i, op.arg_nbytes)
+        stable = True
+        for i in refs:
+            label = ops[i].arg
+            if label not in offsets:
+                raise ValueError(f"Label {label.name} is not defined")
+            n = Hex(offsets[label]).nbytes()
+            if n > refs[i]:
+                refs[i] = n
+                stable = False
+        if stable:
+            break
+
+    linked = []
+    for i, op in enumerate(ops):
+        if i in refs:
+            op = ops_by_name[f"PUSH{refs[i]}"].set_arg(
+                Hex(offsets[op.arg]))
+        elif isinstance(op.arg, Label):
+            op = ops_by_name["JUMPDEST"]
+        linked.append(op)
+    return linked
+
+
+def assemble(ops: Iterable[Op]) -> bytes:
+    """Bytecode of ops, written into a buffer of the final size"""
+    ops = link(ops)
+    code = bytearray(sum(1 + op.arg_nbytes for op in ops))
+    pc = 0
+    for op in ops:
+        code[pc] = opcodes[op.code]
+        pc += 1
+        n = op.arg_nbytes
+        if n:
+            arg = max(op.arg, 0)
+            if arg.bit_length() > 8 * n:
+                raise ValueError(f"Op {op.name} argument too big")
+            code[pc:pc + n] = arg.to_bytes(n, "big")
+            pc += n
+    return bytes(code)
+
+
+def disassemble(code: Union[bytes, bytearray, memoryview]
+                ) -> Iterator[Tuple[int, Op]]:
+    """(pc, op) pairs of bytecode, decoded as they are consumed
+
+    As in EVM clients, push data running past the end of the code is
+    padded with zeros, and bytes that are no known opcode decode to
+    INVALID, keeping their code.
+    """
+    view = memoryview(code)
+    pc = 0
+    while pc < len(view):
+        byte = view[pc]
+        op = ops_by_byte.get(byte)
+        if op is None:
+            op = Op("INVALID", f"{byte:02x}", 0, Hex(-1), 0, 0, 0)
+        n = op.arg_nbytes
+        if n:
+            data = view[pc + 1:pc + 1 + n]
+            arg = int.from_bytes(data, "big") << 8 * (n - len(data))
+            op = op.set_arg(Hex(arg))
+        yield pc, op
+        pc += 1 + n
+
+
 def to_ops(bytecode: str) -> Iterator[Op]:
-    ibytecode = iter_bytes(bytecode)
-    for code in ibytecode:
-        try:
-            op = ops_by_code[code]
-        except KeyError:
-            raise ValueError(f"Could not find opcode {code}")
-        args = []
-        for _ in range(op.arg_nbytes):
-            args.append(next(ibytecode))
-        op = op.set_arg("".join(args))
+    for _, op in disassemble(bytes.fromhex(bytecode)):
         yield op
-        
+
 
 def from_ops(ops: Iterable[Op]) -> str:
-    result = []
-    for op in ops:
-        result.append(op.to_hex())
-    return "".join(result)
+    return assemble(ops).hex()
 
 
 # DEPRECATED
@@ -0,0 +1,96 @@
+"""EVMMAX execution: SETMODX, ADDMODX, SUBMODX, MULMONTX and TOMONTX
+
+Values live in EVM memory in slots of 8 * limbs bytes, starting at the
+frame's `slot_offset`. This is the addressing of `MemoryAllocator.slot`:
+slot = (addr - offset_max) // (8 * size_max).
+"""
+
+
+class ModContext:
+    """Montgomery arithmetic over the modulus set by SETMODX"""
+    def __init__(self, modulus: int, limbs: int):
+        if modulus % 2 == 0 or modulus < 3:
+            raise ValueError(f"EVMMAX modulus must be odd and > 1: "
+                             f"passed {modulus:#x}")
+        if modulus.bit_length() > 64 * limbs:
+            raise ValueError(f"EVMMAX modulus does not fit in {limbs} limbs")
+        self.modulus = modulus
+        self.limbs = limbs
+        self.slot_size = 8 * limbs
+        self.bits = 64 * limbs
+        self.mask = (1 << self.bits) - 1
+        self.n_prime = -pow(modulus, -1, 1 << self.bits) & self.mask
+
+    def addmod(self, x, y):
+        r = x + y
+        return r - self.modulus if r >= self.modulus else r
+
+    def submod(self, x, y):
+        r = x - y
+        return r + self.modulus if r < 0 else r
+
+    def mulmont(self, x, y):
+        # REDC(x * y) = x * y * R^-1 mod N, with R = 2**(64 * limbs)
+        t = x * y
+        m = ((t & self.mask) * self.n_prime) & self.mask
+        u = (t + m * self.modulus) >> self.bits
+        return u - self.modulus if u >= self.modulus else u
+
+    def tomont(self, x):
+        return (x << self.bits) % self.modulus
+
+
+def _context(f):
+    if f.modx is None:
+        raise ValueError("EVMMAX op executed before SETMODX")
+    return f.modx
+
+
+def _addr(f, ctx, slot):
+    return f.slot_offset + slot * ctx.slot_size
+
+
+def load(f, slot):
+    ctx = _context(f)
+    addr = _addr(f, ctx, slot)
+    f.expand(addr, ctx.slot_size)
+    return int.from_bytes(f.memory[addr:addr + ctx.slot_size], f.byteorder)
+
+
+def store(f, slot, value):
+    ctx = _context(f)
+    addr = _addr(f, ctx, slot)
+    f.expand(addr, ctx.slot_size)
+    f.memory[addr:addr + ctx.slot_size] = value.to_bytes(ctx.slot_size,
+                                                         f.byteorder)
+
+
+def _setmodx(f, arg):
+    s = f.stack
+    offset = s.pop()
+    limbs = s.pop()
+    f.expand(offset, 8 * limbs)
+    modulus = int.from_bytes(f.memory[offset:offset + 8 * limbs], f.byteorder)
+    f.modx = ModContext(modulus, limbs)
+
+
+def _ternary(method):
+    def handler(f, arg):
+        dest, x, y = arg >> 16, (arg >> 8) & 0xff, arg & 0xff
+        fn = getattr(_context(f), method)
+        store(f, dest, fn(load(f, x), load(f, y)))
+    return handler
+
+
+def _tomontx(f, arg):
+    slot = f.stack.pop()
+    store(f, slot, _context(f).tomont(load(f, slot)))
+
+
+handlers = {
+    "SETMODX": _setmodx,
+    "ADDMODX": _ternary("addmod"),
+    "SUBMODX": _ternary("submod"),
+    "MULMONTX": _ternary("mulmont"),
+    "TOMONTX": _tomontx,
+}
@@ -0,0 +1,329 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Union
+
+from .interpreter import memory_cost
+from .ops import ops
+from .program import Program, ProgramSegment
+
+
+EVMMAX_OPS = ("SETMODX", "ADDMODX", "SUBMODX", "MULMONTX", "TOMONTX")
+
+
+@dataclass
+class GasSchedule:
+    name: str
+    costs: Mapping[str, int]
+
+    def __getitem__(self, name):
+        try:
+            return self.costs[name]
+        except KeyError:
+            raise ValueError(f"Op {name} is not available in {self.name}")
+
+
+def eip5843(limbs=4):
+    # Additions linear and multiplications quadratic in the limb count;
+    # SETMODX pays for the Montgomery precomputation. 4 limbs give the
+    # prices of the README: ADDMODX 1, MULMONTX 2, SETMODX 90
+    add = max(1, round(0.2 * limbs + 0.3))
+    mul = max(1, round(0.09 * limbs ** 2 + 0.2 * limbs + 0.2))
+    return {"SETMODX": 22 * limbs + 2, "ADDMODX": add, "SUBMODX": add,
+            "MULMONTX": mul, "TOMONTX": mul}
+
+
+def eip6601(limbs=4):
+    # EIP-6601 prices the arithmetic per limb count from benchmarks of
+    # unrolled Montgomery code: one gas up to 4 limbs, then quadratic for
+    # multiplications. Its SETUPX precomputation is charged by SETMODX
+    add = -(-limbs // 16)
+    mul = max(1, round(0.05 * limbs ** 2 + 0.25))
+    return {"SETMODX": 3 * limbs + 3, "ADDMODX": add, "SUBMODX": add,
+            "MULMONTX": mul, "TOMONTX": mul}
+
+
+shanghai = {op.name: op.gas for op in ops if op.name not in EVMMAX_OPS}
+london = {k: v for k, v in shanghai.items() if k != "PUSH0"}
+
+forks = {"london": london, "shanghai": shanghai}
+evmmax_pricing = {"eip5843": eip5843, "eip6601": eip6601}
+
+
+def build_schedule(fork="shanghai", evmmax="eip5843", limbs=4, **overrides):
+    costs = dict(forks[fork])
+    if evmmax is not None:
+        costs.update(evmmax_pricing[evmmax](limbs))
+    costs.update(overrides)
+    name = fork if evmmax is None else f"{fork}+{evmmax}"
+    return GasSchedule(name, costs)
+
+
+@dataclass
+class GasReport:
+    total: int = 0
+    memory: int = 0
+    copy: int = 0
+    by_op: Mapping[str, int] = field(default_factory=dict)
+    counts: Mapping[str, int] = field(default_factory=dict)
+    memory_size: int = 0
+
+
+groups = {op.name: ''.join(i for i in op.name if not i.isdigit())
+          for op in ops}
+
+
+class _Block:
+    """Straight-line code summarised as its effect on stack and memory
+
+    Values are ints (constants), ("in", j) for the j-th entry of the stack at
+    block entry, ("load", k) for the value of the k-th MLOAD, or None
+    (unknown). Memory effects are events, replayed in order by _Walker.
+    """
+    def __init__(self):
+        self.gas = 0
+        self.counts = {}
+        self.by_op = {}
+        self.consumed = 0
+        self.n_loads = 0
+        self.pushes = []
+        self.events = []
+        self.terminator = None
+        self.target = None
+        self.condition = None
+        self.end = None
+
+
+def _summarise(ops, start, costs):
+    b = _Block()
+    stack = b.pushes
+
+    def pop():
+        if stack:
+            return stack.pop()
+        b.consumed += 1
+        return ("in", b.consumed - 1)
+
+    i = start
+    while i < len(ops):
+        op = ops[i]
+        name = op.name
+        if name == "JUMPDEST" and i != start:
+            break
+        g = costs[name]
+        group = groups[name]
+        b.gas += g
+        b.counts[group] = b.counts.get(group, 0) + 1
+        b.by_op[group] = b.by_op.get(group, 0) + g
+        i += 1
+        if group == "PUSH":
+            # Label PUSHes of an unlinked segment are unknown values
+            arg = op.arg
+            stack.append(max(arg, 0) if isinstance(arg, int) else None)
+        elif group == "DUP":
+            n = int(name[3:])
+            while len(stack) < n:
+                stack.insert(0, ("in", b.consumed))
+                b.consumed += 1
+            stack.append(stack[-n])
+        elif group == "SWAP":
+            n = int(name[4:])
+            while len(stack) < n + 1:
+                stack.insert(0, ("in", b.consumed))
+                b.consumed += 1
+            stack[-1], stack[-n - 1] = stack[-n - 1], stack[-1]
+        elif name == "MLOAD":
+            addr = pop()
+            b.events.append(("touch", addr, 32))
+            b.events.append(("load", addr, b.n_loads))
+            stack.append(("load", b.n_loads))
+            b.n_loads += 1
+        elif name == "MSTORE":
+            addr = pop()
+            value = pop()
+            b.events.append(("touch", addr, 32))
+            b.events.append(("write", addr, value))
+        elif name in ("CALLDATACOPY", "CODECOPY"):
+            dest, _, size = pop(), pop(), pop()
+            b.events.append(("touch", dest, size))
+            b.events.append(("copy", size))
+            b.events.append(("clobber", dest, size))
+        elif name in ("RETURN", "REVERT"):
+            offset, size = pop(), pop()
+            b.events.append(("touch", offset, size))
+            b.terminator = name
+            break
+        elif name == "SETMODX":
+            pop()
+            b.events.append(("setmodx", pop()))
+        elif name == "TOMONTX":
+            slot = pop()
+            b.events.append(("slot", slot))
+            b.events.append(("slot-write", slot))
+        elif name in ("ADDMODX", "SUBMODX", "MULMONTX"):
+            arg = int(op.arg)
+            for slot in (arg >> 16, (arg >> 8) & 0xff, arg & 0xff):
+                b.events.append(("slot", slot))
+            # Slots alias memory: forget the words of the destination
+            b.events.append(("slot-write", arg >> 16))
+        elif name == "JUMP":
+            b.target = pop()
+            b.terminator = name
+            break
+        elif name == "JUMPI":
+            b.target = pop()
+            b.condition = pop()
+            b.terminator = name
+            break
+        elif name in ("STOP", "INVALID", "SELFDESTRUCT"):
+            b.terminator = name
+            break
+        else:
+            for _ in range(op.stack_in):
+                pop()
+            stack.extend([None] * op.stack_out)
+    b.end = i
+    return b
+
+
+class _Walker:
+    def __init__(self, slot_offset):
+        self.stack = []
+        self.memory = {}
+        self.slot_offset = slot_offset
+        self.slot_size = 32
+        self.memory_size = 0
+        self.copy = 0
+
+    def resolve(self, v, loads):
+        if isinstance(v, tuple):
+            if v[0] == "in":
+                return self.stack[-1 - v[1]] if v[1] < len(self.stack) else None
+            return loads[v[1]]
+        return v
+
+    def clobber(self, addr, size):
+        """Forget the words overlapping [addr, addr + size)"""
+        if addr is None or size is None:
+            self.memory.clear()
+            return
+        for a in range(addr - 31, addr + size):
+            self.memory.pop(a, None)
+
+    def touch(self, addr, size):
+        if addr is None or size is None:
+            raise ValueError("Memory access at an address unknown statically")
+        if size:
+            self.memory_size = max(self.memory_size,
+                                   32 * ((addr + size + 31) // 32))
+
+    def apply(self, b, report):
+        loads = [None] * b.n_loads
+
+        def r(v):
+            return self.resolve(v, loads)
+
+        for event in b.events:
+            kind = event[0]
+            if kind == "touch":
+                self.touch(r(event[1]), r(event[2]))
+            elif kind == "copy":
+                size = r(event[1])
+                self.copy += 3 * (((size or 0) + 31) // 32)
+            elif kind == "setmodx":
+                limbs = r(event[1])
+                if limbs is not None:
+                    self.slot_size = 8 * limbs
+            elif kind == "slot":
+                slot = r(event[1])
+                self.touch(None if slot is None else
+                           self.slot_offset + slot * self.slot_size,
+                           self.slot_size)
+            elif kind == "load":
+                addr = r(event[1])
+                loads[event[2]] = (None if addr is None
+                                   else self.memory.get(addr))
+            elif kind == "write":
+                addr = r(event[1])
+                self.clobber(addr, 32)
+                if addr is not None:
+                    self.memory[addr] = r(event[2])
+            elif kind == "clobber":
+                self.clobber(r(event[1]), r(event[2]))
+            elif kind == "slot-write":
+                slot = r(event[1])
+                self.clobber(None if slot is None else
+                             self.slot_offset + slot * self.slot_size,
+                             self.slot_size)
+        pushes = [r(v) for v in b.pushes]
+        target, condition = r(b.target), r(b.condition)
+        del self.stack[max(0, len(self.stack) - b.consumed):]
+        self.stack.extend(pushes)
+        report.total += b.gas
+        for k, v in b.counts.items():
+            report.counts[k] = report.counts.get(k, 0) + v
+        for k, v in b.by_op.items():
+            report.by_op[k] = report.by_op.get(k, 0) + v
+        return target, condition
+
+
+def _pcs(ops):
+    pcs = []
+    pc = 0
+    for op in ops:
+        pcs.append(pc)
+        pc += 1 + op.arg_nbytes
+    return pcs
+
+
+def estimate(obj: Union[Program, ProgramSegment], schedule: GasSchedule = None,
+             slot_offset: int = 0, max_blocks: int = 1_000_000) -> GasReport:
+    """Static gas of a Program or ProgramSegment, without executing it
+
+    A Program is walked block by block, following jumps whose targets are
+    known statically (pushed constants and return addresses stored in
+    memory). A ProgramSegment is costed as straight-line code. Conditional
+    jumps on runtime data cannot be resolved and raise ValueError.
+    """
+    costs = schedule or build_schedule()
+    follow = isinstance(obj, Program)
+    ops_ = obj.link() if follow else obj.ops
+    index = {}
+    if follow:
+        for i, pc in enumerate(_pcs(ops_)):
+            if ops_[i].name == "JUMPDEST":
+                index[pc] = i
+
+    report = GasReport()
+    walker = _Walker(slot_offset)
+    blocks = {}
+    i = 0
+    n_blocks = 0
+    while i < len(ops_):
+        if i not in blocks:
+            blocks[i] = _summarise(ops_, i, costs)
+        b = blocks[i]
+        target, condition = walker.apply(b, report)
+        n_blocks += 1
+        if n_blocks > max_blocks:
+            raise ValueError("Static walk did not terminate")
+        if b.terminator in ("RETURN", "REVERT", "STOP", "INVALID",
+                            "SELFDESTRUCT"):
+            break
+        if not follow or b.terminator is None:
+            i = b.end
+            continue
+        if b.terminator == "JUMPI":
+            if condition is None:
+                raise ValueError("Conditional jump depends on runtime data")
+            if not condition:
+                i = b.end
+                continue
+        if target is None or target not in index:
+            raise ValueError(f"Jump target unknown statically: {target}")
+        i = index[target]
+
+    report.copy = walker.copy
+    report.memory_size = walker.memory_size
+    report.memory = memory_cost(walker.memory_size // 32)
+    report.total += report.memory + report.copy
+    return report
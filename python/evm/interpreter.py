@@ -0,0 +1,412 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Union
+
+from . import bytecode
+from . import evmmax
+
+
+MASK = (1 << 256) - 1
+SIGN = 1 << 255
+MAX_STACK = 1024
+
+
+class ExecutionError(Exception):
+    """Exceptional halt of the EVM (bad jump, stack underflow, out of gas)"""
+
+
+@dataclass
+class Result:
+    output: bytes
+    gas: int
+    n_ops: int
+    counts: Mapping[str, int]
+    by_op: Mapping[str, int]
+    reverted: bool = False
+
+
+def memory_cost(n_words: int) -> int:
+    return 3 * n_words + n_words * n_words // 512
+
+
+def _signed(x):
+    return x - (1 << 256) if x & SIGN else x
+
+
+class Frame:
+    def __init__(self, calldata, code, slot_offset=0, byteorder="big",
+                 gas_limit=float("inf")):
+        self.stack = []
+        self.memory = bytearray()
+        self.calldata = bytes(calldata)
+        self.code = code
+        self.gas = 0
+        self.gas_limit = gas_limit
+        self.output = b""
+        self.reverted = False
+        # EVMMAX context, set by SETMODX
+        self.modx = None
+        self.slot_offset = slot_offset
+        self.byteorder = byteorder
+
+    def expand(self, offset, size):
+        if size == 0:
+            return
+        end = offset + size
+        if end > len(self.memory):
+            old = len(self.memory) // 32
+            new = (end + 31) // 32
+            self.gas += memory_cost(new) - memory_cost(old)
+            # Charge before growing, so a huge offset runs out of gas instead
+            # of allocating
+            if self.gas > self.gas_limit:
+                raise ExecutionError("Out of gas")
+            self.memory.extend(bytes(32 * (new - old)))
+
+    def mload(self, offset):
+        self.expand(offset, 32)
+        return int.from_bytes(self.memory[offset:offset + 32], "big")
+
+    def mstore(self, offset, value):
+        self.expand(offset, 32)
+        self.memory[offset:offset + 32] = value.to_bytes(32, "big")
+
+
+# Handlers take the frame and the pre-resolved immediate. They return None
+# to fall through, the next instruction index for jumps, or -1 to halt.
+
+def _stop(f, arg):
+    return -1
+
+
+def _binop(fn):
+    def handler(f, arg):
+        s = f.stack
+        a = s.pop()
+        s[-1] = fn(a, s[-1]) & MASK
+    return handler
+
+
+def _unop(fn):
+    def handler(f, arg):
+        s = f.stack
+        s[-1] = fn(s[-1]) & MASK
+    return handler
+
+
+def _div(a, b):
+    return a // b if b else 0
+
+
+def _sdiv(a, b):
+    if b == 0:
+        return 0
+    a, b = _signed(a), _signed(b)
+    q = abs(a) // abs(b)
+    return -q if (a < 0) != (b < 0) else q
+
+
+def _smod(a, b):
+    if b == 0:
+        return 0
+    a, b = _signed(a), _signed(b)
+    r = abs(a) % abs(b)
+    return -r if a < 0 else r
+
+
+def _signextend(b, x):
+    if b >= 31:
+        return x
+    bit = 8 * b + 7
+    mask = (1 << bit) - 1
+    return x | (MASK - mask) if x & (1 << bit) else x & mask
+
+
+def _byte(i, x):
+    return (x >> (8 * (31 - i))) & 0xff if i < 32 else 0
+
+
+def _sar(shift, x):
+    return _signed(x) >> min(shift, 256)
+
+
+def _addmod(f, arg):
+    s = f.stack
+    a = s.pop()
+    b = s.pop()
+    n = s[-1]
+    s[-1] = (a + b) % n if n else 0
+
+
+def _mulmod(f, arg):
+    s = f.stack
+    a = s.pop()
+    b = s.pop()
+    n = s[-1]
+    s[-1] = (a * b) % n if n else 0
+
+
+def _exp(f, arg):
+    s = f.stack
+    a = s.pop()
+    b = s[-1]
+    f.gas += 50 * ((b.bit_length() + 7) // 8)
+    s[-1] = pow(a, b, 1 << 256)
+
+
+def _calldataload(f, arg):
+    s = f.stack
+    offset = s[-1]
+    data = f.calldata[offset:offset + 32] if offset < len(f.calldata) else b""
+    s[-1] = int.from_bytes(data.ljust(32, b"\x00"), "big")
+
+
+def _calldatasize(f, arg):
+    f.stack.append(len(f.calldata))
+
+
+def _copy(source):
+    def handler(f, arg):
+        s = f.stack
+        dest = s.pop()
+        offset = s.pop()
+        size = s.pop()
+        f.expand(dest, size)
+        f.gas += 3 * ((size + 31) // 32)
+        data = source(f)[offset:offset + size] if offset < len(source(f)) else b""
+        f.memory[dest:dest + size] = data.ljust(size, b"\x00")
+    return handler
+
+
+def _codesize(f, arg):
+    f.stack.append(len(f.code))
+
+
+def _pop(f, arg):
+    f.stack.pop()
+
+
+def _mload(f, arg):
+    s = f.stack
+    s[-1] = f.mload(s[-1])
+
+
+def _mstore(f, arg):
+    s = f.stack
+    offset = s.pop()
+    f.mstore(offset, s.pop())
+
+
+def _mstore8(f, arg):
+    s = f.stack
+    offset = s.pop()
+    f.expand(offset, 1)
+    f.memory[offset] = s.pop() & 0xff
+
+
+def _msize(f, arg):
+    f.stack.append(len(f.memory))
+
+
+def _gas(f, arg):
+    f.stack.append(MASK)
+
+
+def _jump(f, arg):
+    pass  # resolved in Interpreter.run
+
+
+def _jumpi(f, arg):
+    pass  # resolved in Interpreter.run
+
+
+def _jumpdest(f, arg):
+    pass
+
+
+def _push(f, arg):
+    f.stack.append(arg)
+
+
+def _dup(n):
+    def handler(f, arg):
+        f.stack.append(f.stack[-n])
+    return handler
+
+
+def _swap(n):
+    def handler(f, arg):
+        s = f.stack
+        s[-1], s[-n - 1] = s[-n - 1], s[-1]
+    return handler
+
+
+def _return(f, arg):
+    s = f.stack
+    offset = s.pop()
+    size = s.pop()
+    f.expand(offset, size)
+    f.output = bytes(f.memory[offset:offset + size])
+    return -1
+
+
+def _revert(f, arg):
+    _return(f, arg)
+    f.reverted = True
+    return -1
+
+
+def _invalid(f, arg):
+    raise ExecutionError("Invalid instruction")
+
+
+def _unsupported(name):
+    def handler(f, arg):
+        raise ExecutionError(f"Op {name} is not supported by the interpreter")
+    return handler
+
+
+handlers = {
+    "STOP": _stop,
+    "ADD": _binop(lambda a, b: a + b),
+    "MUL": _binop(lambda a, b: a * b),
+    "SUB": _binop(lambda a, b: a - b),
+    "DIV": _binop(_div),
+    "SDIV": _binop(_sdiv),
+    "MOD": _binop(lambda a, b: a % b if b else 0),
+    "SMOD": _binop(_smod),
+    "ADDMOD": _addmod,
+    "MULMOD": _mulmod,
+    "EXP": _exp,
+    "SIGNEXTEND": _binop(_signextend),
+    "LT": _binop(lambda a, b: int(a < b)),
+    "GT": _binop(lambda a, b: int(a > b)),
+    "SLT": _binop(lambda a, b: int(_signed(a) < _signed(b))),
+    "SGT": _binop(lambda a, b: int(_signed(a) > _signed(b))),
+    "EQ": _binop(lambda a, b: int(a == b)),
+    "ISZERO": _unop(lambda a: int(a == 0)),
+    "AND": _binop(lambda a, b: a & b),
+    "OR": _binop(lambda a, b: a | b),
+    "XOR": _binop(lambda a, b: a ^ b),
+    "NOT": _unop(lambda a: ~a),
+    "BYTE": _binop(_byte),
+    "SHL": _binop(lambda a, b: b << a if a < 256 else 0),
+    "SHR": _binop(lambda a, b: b >> a),
+    "SAR": _binop(_sar),
+    "CALLDATALOAD": _calldataload,
+    "CALLDATASIZE": _calldatasize,
+    "CALLDATACOPY": _copy(lambda f: f.calldata),
+    "CODESIZE": _codesize,
+    "CODECOPY": _copy(lambda f: f.code),
+    "POP": _pop,
+    "MLOAD": _mload,
+    "MSTORE": _mstore,
+    "MSTORE8": _mstore8,
+    "MSIZE": _msize,
+    "GAS": _gas,
+    "JUMP": _jump,
+    "JUMPI": _jumpi,
+    "JUMPDEST": _jumpdest,
+    "RETURN": _return,
+    "REVERT": _revert,
+    "INVALID": _invalid,
+}
+for _n in range(33):
+    handlers[f"PUSH{_n}"] = _push
+for _n in range(1, 17):
+    handlers[f"DUP{_n}"] = _dup(_n)
+    handlers[f"SWAP{_n}"] = _swap(_n)
+handlers.update(evmmax.handlers)
+
+
+class Interpreter:
+    """EVM interpreter over a pre-decoded instruction array
+
+    The bytecode, as bytes or hex, is decoded once with
+    `bytecode.disassemble`; every instruction is resolved to its handler,
+    immediate and static gas, and jumps go through a bitmap of valid
+    JUMPDEST offsets.
+
+    `gas` overrides the static gas of ops by name (e.g. EVMMAX pricing).
+    EVMMAX slots start at `slot_offset` and are stored with `byteorder`.
+    """
+    def __init__(self, code: Union[str, bytes], gas: Mapping[str, int] = None,
+                 slot_offset: int = 0, byteorder: str = "big"):
+        gas = gas or {}
+        self.slot_offset = slot_offset
+        self.byteorder = byteorder
+        if isinstance(code, str):
+            code = bytes.fromhex(code)
+        self.code = bytes(code)
+        self.instructions = []
+        self.names = []
+        self.index = {}  # pc -> instruction index, for jumpdests only
+        self.jumpdests = bytearray(len(self.code))
+        for pc, op in bytecode.disassemble(self.code):
+            arg = int(op.arg) if op.arg_nbytes else 0
+            if op.name == "JUMPDEST":
+                self.jumpdests[pc] = 1
+                self.index[pc] = len(self.instructions)
+            if op.name == "PC":
+                handler, arg = _push, pc
+            else:
+                handler = handlers.get(op.name) or _unsupported(op.name)
+            self.instructions.append((handler, arg, gas.get(op.name, op.gas)))
+            self.names.append(op.name)
+
+    def _target(self, dest):
+        if dest >= len(self.jumpdests) or not self.jumpdests[dest]:
+            raise ExecutionError(f"Invalid jump destination {dest}")
+        return self.index[dest]
+
+    def run(self, calldata: bytes = b"", gas_limit: int = None) -> Result:
+        limit = float("inf") if gas_limit is None else gas_limit
+        f = Frame(calldata, self.code, self.slot_offset, self.byteorder, limit)
+        instructions = self.instructions
+        hits = [0] * len(instructions)
+        stack = f.stack
+        i = 0
+        try:
+            while i < len(instructions):
+                handler, arg, gas = instructions[i]
+                hits[i] += 1
+                f.gas += gas
+                if handler is _jump:
+                    i = self._target(stack.pop())
+                    continue
+                if handler is _jumpi:
+                    dest = stack.pop()
+                    i = self._target(dest) if stack.pop() else i + 1
+                    continue
+                nxt = handler(f, arg)
+                if nxt == -1:
+                    break
+                if f.gas > limit:
+                    raise ExecutionError("Out of gas")
+                if len(stack) > MAX_STACK:
+                    raise ExecutionError("Stack overflow")
+                i += 1
+        except IndexError:
+            raise ExecutionError(f"Stack underflow at {self.names[i]}")
+        if f.gas > limit:
+            raise ExecutionError("Out of gas")
+        executed = {}
+        by_op = {}
+        for name, (_, _, gas), n in zip(self.names, instructions, hits):
+            if n:
+                name = ''.join(i for i in name if not i.isdigit())
+                executed[name] = executed.get(name, 0) + n
+                by_op[name] = by_op.get(name, 0) + n * gas
+        return Result(
+            output=f.output,
+            gas=f.gas,
+            n_ops=sum(hits),
+            counts=executed,
+            by_op=by_op,
+            reverted=f.reverted,
+        )
+
+
+def run(program, calldata: bytes = b"", gas_limit: int = None,
+        **kwargs) -> Result:
+    return Interpreter(program.assemble(), **kwargs).run(calldata, gas_limit)
@@ -1,10 +1,14 @@
 from collections.abc import Sequence
 from dataclasses import dataclass
 import itertools
+import math
 from typing import Union
 
 from .types import Hex
 
+# EVMMAX ops address slots with one-byte immediates
+MAX_SLOTS = 256
+
 
 @dataclass
 class Variable:
@@ -144,12 +148,89 @@ class MemoryAllocator:
         if name in self.variables:
             raise MemoryError(f"Variable {name} is already allocated")
         if shape:
-            self.variables[name] = Array(name, self.ap, t_size, shape)
+            self.variables[name] = Array(name, Hex(self.ap), t_size, shape)
             self.ap += self.variables[name].m_size
         else:
-            self.variables[name] = Variable(name, self.ap, t_size)
+            self.variables[name] = Variable(name, Hex(self.ap), t_size)
             self.ap += t_size
         return self.variables[name]
 
     def slot(self, var):  # EVM max
         return Hex((var.addr - self.offset_max) // (8*self.size_max))
+
+
+class LivenessAllocator(MemoryAllocator):
+    """MemoryAllocator sharing words between variables of disjoint lifetimes
+
+    Variables are declared with `live` = (first, last), an inclusive range
+    of program points of the caller's choosing, None for the whole
+    program, and get their addresses at `pack`: take views after it. A
+    variable sharing words starts with the values of its predecessors,
+    not zeros. Variables allocated after `pack` go past all others, e.g.
+    buffers growing with the calldata.
+    """
+    def __init__(self, offset=Hex(0), offset_max=Hex(0), size_max=4):
+        super().__init__(offset, offset_max, size_max)
+        self.base = offset
+        self.lifetimes = []
+        self.packed = False
+
+    def alloc(self, name: str, t_size: int=32, shape: int=None, live=None,
+              slot=True):
+        """`slot`=False for variables that are not operands of EVMMAX ops,
+        packed after the others to keep slot numbers low"""
+        var = super().alloc(name, t_size, shape)
+        if not self.packed:
+            first, last = live or (-math.inf, math.inf)
+            self.lifetimes.append((var, first, last, slot))
+        return var
+
+    def _first_fit(self, key):
+        """Start and number of words of each variable, placed by first-fit
+        in order of key(first, last, words), EVMMAX operands first"""
+        unit = 8 * self.size_max
+        sizes = [-(-getattr(var, "m_size", var.t_size) // unit)
+                 for var, *_ in self.lifetimes]
+        order = sorted(range(len(self.lifetimes)), key=lambda i: (
+            not self.lifetimes[i][3],
+            *key(*self.lifetimes[i][1:3], sizes[i]), i))
+        placed = []  # first, last, start word, stop word
+        starts = [0] * len(self.lifetimes)
+        for i in order:
+            _, first, last, _ = self.lifetimes[i]
+            start = 0
+            for s, e in sorted((s, e) for f, l, s, e in placed
+                               if f <= last and first <= l):
+                if start + sizes[i] <= s:
+                    break
+                start = max(start, e)
+            starts[i] = start
+            placed.append((first, last, start, start + sizes[i]))
+        return list(zip(starts, sizes))
+
+    def pack(self):
+        """Assign addresses by first-fit colouring of the interval graph;
+        returns the number of words
+
+        In order of first point, first-fit takes the fewest words when
+        variables are of a word. With arrays it is a heuristic: the order
+        of decreasing lifetime, longest arrays first, is tried too and the
+        layout of fewer words kept.
+        """
+        unit = 8 * self.size_max
+        layout = min(
+            (self._first_fit(lambda first, last, n: (first,)),
+             self._first_fit(lambda first, last, n: (first - last, -n))),
+            key=lambda words: max((s + n for s, n in words), default=0))
+        n_slots = 0
+        for (var, _, _, slot), (start, n) in zip(self.lifetimes, layout):
+            var.addr = Hex(self.base + start * unit)
+            if slot:
+                n_slots = max(n_slots, self.slot(var) + n)
+        if n_slots > MAX_SLOTS:
+            raise ValueError(f"EVMMAX slots exceeded: variables need "
+                             f"{n_slots} slots, max is {MAX_SLOTS}")
+        n_words = max((s + n for s, n in layout), default=0)
+        self.ap = Hex(self.base + n_words * unit)
+        self.packed = True
+        return n_words
@@ -144,12 +144,12 @@ class MemoryAllocator:
         if name in self.variables:
             raise MemoryError(f"Variable {name} is already allocated")
         if shape:
-            self.variables[name] = Array(name, self.ap, t_size, shape)
+            self.variables[name] = Array(name, Hex(self.ap), t_size, shape)
             self.ap += self.variables[name].m_size
         else:
-            self.variables[name] = Variable(name, self.ap, t_size)
+            self.variables[name] = Variable(name, Hex(self.ap), t_size)
             self.ap += t_size
         return self.variables[name]
 
     def slot(self, var):  # EVM max
-        return Hex((var.addr - self.offset_max) / self.size_max)
+        return Hex((var.addr - self.offset_max) // (8*self.size_max))
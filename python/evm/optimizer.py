@@ -0,0 +1,292 @@
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from .gas import GasSchedule, build_schedule
+from .ops import ops_by_name
+from .types import Hex, Label
+
+
+@dataclass
+class RuleStats:
+    applied: int = 0
+    bytes: int = 0
+    gas: int = 0
+
+
+def _push(value):
+    value = Hex(value)
+    if value == 0:
+        return ops_by_name["PUSH0"]
+    return ops_by_name[f"PUSH{value.nbytes()}"].set_arg(value)
+
+
+def _is_push(op):
+    return op.name.startswith("PUSH")
+
+
+def _arg(op):
+    """Pushed constant, None for a label"""
+    if isinstance(op.arg, Label):
+        return None
+    return max(int(op.arg), 0)
+
+
+_BOUNDARIES = ("JUMPDEST", "JUMP", "JUMPI", "STOP", "RETURN", "REVERT",
+               "INVALID")
+_CLOBBERS = ("MSTORE8", "CALLDATACOPY", "CODECOPY", "RETURNDATACOPY",
+             "EXTCODECOPY", "MCOPY", "CALL", "CALLCODE", "DELEGATECALL",
+             "STATICCALL", "ADDMODX", "SUBMODX", "MULMONTX", "TOMONTX")
+
+
+def _access(ops, i):
+    """(name, address) of PUSH a MLOAD / PUSH a MSTORE at i, else None"""
+    if (i + 1 < len(ops) and _is_push(ops[i]) and _arg(ops[i]) is not None
+            and ops[i + 1].name in ("MLOAD", "MSTORE")):
+        return ops[i + 1].name, _arg(ops[i])
+    return None
+
+
+def _chains(ops, start, with_store):
+    """Indices of the PUSH of accesses to an address, from a store (or a
+    load) to the loads following it while memory at the address is
+    unchanged, within basic blocks, ordered by first access"""
+    open_ = {}
+    found = []
+
+    def close(addrs):
+        for a in list(addrs):
+            chain = open_.pop(a)
+            if len(chain) > 1:
+                found.append(chain)
+
+    i = start
+    while i < len(ops):
+        access = _access(ops, i)
+        if access is not None:
+            name, a = access
+            if name == "MSTORE":
+                close([b for b in open_ if abs(b - a) < 32])
+                if with_store:
+                    open_[a] = [i]
+            elif a in open_ or not with_store:
+                open_.setdefault(a, []).append(i)
+            i += 2
+            continue
+        name = ops[i].name
+        if name in _BOUNDARIES or name in _CLOBBERS or name == "MSTORE":
+            close(open_)
+        i += 1
+    close(open_)
+    return sorted(found)
+
+
+def _depth(stack, n):
+    """Depth of the n-th value from the top, not counting the kept copy"""
+    seen = 0
+    for d, kept in enumerate(reversed(stack), 1):
+        if not kept:
+            seen += 1
+            if seen == n:
+                return d
+    return len(stack) + n - seen
+
+
+# Ops over which a copy may be kept on the stack
+WINDOW = 512
+
+
+def _hoist(ops, first):
+    """Index before the load at first, as early as memory at its address
+    is unchanged, where the stack is the lowest: a copy loaded there sits
+    below the operands of the ops up to the load"""
+    a = _arg(ops[first])
+    best, low = first, 0
+    height = 0
+    i = first - 1
+    while i >= max(first - WINDOW, 0):
+        op = ops[i]
+        name = op.name
+        if (name in _BOUNDARIES or name in _CLOBBERS
+                or name == "MSTORE" and (
+                    not _is_push(ops[i - 1]) or _arg(ops[i - 1]) is None
+                    or abs(_arg(ops[i - 1]) - a) < 32)):
+            break
+        height -= op.stack_out - op.stack_in
+        if height < low:
+            best, low = i, height
+        i -= 1
+    return best
+
+
+def _forward(ops, chain):
+    """(start, ops, stop): ops replacing ops[start:stop], the value at the
+    address being kept on the stack from the first access of the chain and
+    DUPed by the others; None if stack depths do not allow it
+
+    A stored value is copied by DUP1 before the store, a loaded one is
+    loaded once at the lowest stack point before its first load. `stack`
+    holds the values above those at that point, True for the kept copy:
+    DUP and SWAP indices are recomputed around it. The copy is consumed by
+    the last load when on top of the stack or below it, otherwise POPed
+    once back on top.
+    """
+    first, uses = chain[0], set(chain[1:])
+    last = chain[-1]
+    if ops[first + 1].name == "MSTORE":
+        start = first
+        out = [ops_by_name["DUP1"], ops[first], ops[first + 1]]
+        i = first + 2
+    else:
+        start = _hoist(ops, first)
+        uses.add(first)
+        out = [ops[first], ops[first + 1]]
+        i = start
+    stack = [True]
+
+    def fill(n):
+        while len(stack) < n:
+            stack.insert(0, False)
+
+    while i < min(len(ops), first + WINDOW):
+        op = ops[i]
+        name = op.name
+        if True not in stack:
+            return start, out, i
+        if i > last and stack[-1]:
+            out.append(ops_by_name["POP"])
+            return start, out, i
+        if i in uses:
+            d = len(stack) - stack.index(True)
+            if i == last and d <= 2:
+                if d == 2:
+                    out.append(ops_by_name["SWAP1"])
+                    stack[-1], stack[-2] = stack[-2], stack[-1]
+                stack[-1] = False
+            else:
+                if d > 16:
+                    return None
+                out.append(ops_by_name[f"DUP{d}"])
+                stack.append(False)
+            i += 2
+            continue
+        if name in _BOUNDARIES:
+            return None
+        if name.startswith("DUP"):
+            d = _depth(stack, int(name[3:]))
+            if d > 16:
+                return None
+            fill(d)
+            out.append(ops_by_name[f"DUP{d}"])
+            stack.append(False)
+        elif name.startswith("SWAP"):
+            d = _depth(stack, int(name[4:]) + 1)
+            if _depth(stack, 1) != 1 or d > 17:
+                return None
+            fill(d)
+            out.append(ops_by_name[f"SWAP{d - 1}"])
+        else:
+            if op.stack_in and _depth(stack, op.stack_in) != op.stack_in:
+                return None  # would consume the kept copy
+            fill(op.stack_in)
+            del stack[len(stack) - op.stack_in:]
+            stack.extend(False for _ in range(op.stack_out))
+            out.append(op)
+        i += 1
+    if True not in stack:
+        return start, out, i
+    return None
+
+
+class _Rewriter:
+    def __init__(self, schedule: GasSchedule):
+        self.schedule = schedule
+        self.stats = {}
+
+    def record(self, rule, old, new):
+        s = self.stats.setdefault(rule, RuleStats())
+        s.applied += 1
+        s.bytes += sum(1 + op.arg_nbytes for op in old)
+        s.bytes -= sum(1 + op.arg_nbytes for op in new)
+        s.gas += sum(self.schedule[op.name] for op in old)
+        s.gas -= sum(self.schedule[op.name] for op in new)
+
+    def push_width(self, ops):
+        """PUSHn with leading zero bytes -> smallest PUSH, PUSH0 for 0"""
+        out = []
+        for op in ops:
+            if _is_push(op) and _arg(op) is not None:
+                new = _push(_arg(op))
+                if new.name == "PUSH0" and "PUSH0" not in self.schedule.costs:
+                    new = ops_by_name["PUSH1"].set_arg(Hex(0))
+                if new.name != op.name:
+                    self.record("push-width", [op], [new])
+                    op = new
+            out.append(op)
+        return out
+
+    def _forward_all(self, rule, ops, with_store):
+        i = 0
+        while True:
+            for chain in _chains(ops, i, with_store):
+                # Longest prefix of the chain that can be forwarded
+                best = None
+                for n in range(2, len(chain) + 1):
+                    result = _forward(ops, chain[:n])
+                    if result is None:
+                        break
+                    start, new, stop = result
+                    saved = self._gas(ops[start:stop]) - self._gas(new)
+                    if saved > 0:
+                        best = result
+                if best is not None:
+                    start, new, stop = best
+                    self.record(rule, ops[start:stop], new)
+                    ops = ops[:start] + new + ops[stop:]
+                    i = start + 1
+                    break
+            else:
+                return ops
+
+    def _gas(self, ops):
+        return sum(self.schedule[op.name] for op in ops)
+
+    def store_load(self, ops):
+        """PUSH a MSTORE ... PUSH a MLOAD -> DUP1 PUSH a MSTORE ... DUPn,
+        the stored value being kept on the stack until its last load"""
+        return self._forward_all("store-load", ops, True)
+
+    def redundant_load(self, ops):
+        """PUSH a MLOAD ... PUSH a MLOAD -> PUSH a MLOAD ... DUPn ... DUPm,
+        the value being loaded once, where the stack is lowest before its
+        first load, and kept on the stack until its last load"""
+        return self._forward_all("redundant-load", ops, False)
+
+
+rules = ("push-width", "store-load", "redundant-load")
+
+
+def optimize(program, enabled=rules,
+             schedule: GasSchedule = None) -> Mapping[str, RuleStats]:
+    """Peephole pass over program.ops, in place, until a fixpoint
+
+    Returns bytes and gas saved per rule. Rewrites move code: jumps must
+    target labels, resolved when the program is linked, so programs with
+    jumps and unlabelled JUMPDESTs are rejected.
+    """
+    if (any(op.name in ("JUMP", "JUMPI") for op in program.ops)
+            and any(op.name == "JUMPDEST" and not isinstance(op.arg, Label)
+                    for op in program.ops)):
+        raise ValueError(
+            "Peephole rewriting would break hard-coded jump targets")
+    rewriter = _Rewriter(schedule or build_schedule())
+    ops = list(program.ops)
+    while True:
+        n_bytes = sum(1 + op.arg_nbytes for op in ops)
+        n_ops = len(ops)
+        for rule in enabled:
+            ops = getattr(rewriter, rule.replace("-", "_"))(ops)
+        if (n_ops == len(ops)
+                and n_bytes == sum(1 + op.arg_nbytes for op in ops)):
+            break
+    program.ops[:] = ops
+    return rewriter.stats
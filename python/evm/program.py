@@ -1,12 +1,16 @@
 from . import bytecode
 from .memory import MemoryAllocator, Variable, Array
 from .ops import ops_by_name
-from .types import Hex
+from .types import Hex, Label
+
+
+# EIP-170: maximum size of deployed runtime code, in bytes
+MAX_CODE_SIZE = 0x6000
 
 
 class Program:
-    def __init__(self):
-        self.memory = MemoryAllocator()
+    def __init__(self, memory=None):
+        self.memory = MemoryAllocator() if memory is None else memory
         self.segments = {}
         self.ops = []
 
@@ -17,20 +21,41 @@ class Program:
         self.segments[label] = ProgramSegment(self)
         return self.segments[label]
 
+    def link(self):
+        """Ops with labels resolved to code offsets"""
+        return bytecode.link(self.ops)
+
+    def assemble(self) -> bytes:
+        return bytecode.assemble(self.ops)
+
     def compile_runtime(self):
-        return bytecode.from_ops(self.ops)
+        return self.assemble().hex()
+
+    def code_size(self):
+        return sum(op.nbytes() for op in self.link())
+
+
+# Width counted for a PUSH of a label until the program is linked
+LABEL_PUSH = "PUSH2"
 
 
 class ProgramSegment:
+    """Ops of a part of the program. Ops are added through the methods
+    below, which keep track of the segment size in bytes; PUSHes of labels
+    count as LABEL_PUSH, an upper bound for code within EIP-170."""
     def __init__(self, program):
         self.program = program
         self.memory = program.memory
         self.ops = []
-        self.offset = None
+        self.size = 0
+        self.n_calls = 0
 
     def __len__(self):
-        return sum(op.nbytes() for op in self.ops)
-        # return len(self.ops)
+        return self.size
+
+    def _emit(self, op):
+        self.ops.append(op)
+        self.size += 1 + op.arg_nbytes
 
     def _push_if_not_none(self, *args):
         # Assume that last args are on stack and ordered (possibly empty)
@@ -45,47 +70,70 @@ class ProgramSegment:
                         f"Unordered arguments are not supported")
 
     def stop(self):
-        self.ops.append(ops_by_name["STOP"])
+        self._emit(ops_by_name["STOP"])
 
     def add(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["ADD"])
+        self._emit(ops_by_name["ADD"])
 
     def mul(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["MUL"])
+        self._emit(ops_by_name["MUL"])
 
     def sub(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["SUB"])
+        self._emit(ops_by_name["SUB"])
 
     def div(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["DIV"])
+        self._emit(ops_by_name["DIV"])
 
     def sdiv(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["SDIV"])
+        self._emit(ops_by_name["SDIV"])
 
     def mod(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["MOD"])
+        self._emit(ops_by_name["MOD"])
 
     def smod(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["SMOD"])
+        self._emit(ops_by_name["SMOD"])
 
     def addmod(self, x=None, y=None, N=None):
         self._push_if_not_none(x, y, N)
-        self.ops.append(ops_by_name["ADDMOD"])
+        self._emit(ops_by_name["ADDMOD"])
 
     def mulmod(self, x=None, y=None, N=None):
         self._push_if_not_none(x, y, N)
-        self.ops.append(ops_by_name["MULMOD"])
+        self._emit(ops_by_name["MULMOD"])
 
     def exp(self, x=None, y=None):
         self._push_if_not_none(x, y)
-        self.ops.append(ops_by_name["EXP"])
+        self._emit(ops_by_name["EXP"])
+
+    def lt(self, x=None, y=None):
+        self._push_if_not_none(x, y)
+        self._emit(ops_by_name["LT"])
+
+    def gt(self, x=None, y=None):
+        self._push_if_not_none(x, y)
+        self._emit(ops_by_name["GT"])
+
+    def iszero(self, x=None):
+        self._push_if_not_none(x)
+        self._emit(ops_by_name["ISZERO"])
+
+    def or_(self, x=None, y=None):
+        self._push_if_not_none(x, y)
+        self._emit(ops_by_name["OR"])
+
+    def calldatasize(self):
+        self._emit(ops_by_name["CALLDATASIZE"])
+
+    def calldataload(self, offset=None):
+        self._push_if_not_none(offset)
+        self._emit(ops_by_name["CALLDATALOAD"])
 
     def calldatacopy(self, dest=None, offset=None, size=None):
         if isinstance(dest, Variable):
@@ -94,14 +142,14 @@ class ProgramSegment:
             self.push(dest.addr)
         else:
             self._push_if_not_none(dest, offset, size)
-        self.ops.append(ops_by_name["CALLDATACOPY"])
+        self._emit(ops_by_name["CALLDATACOPY"])
     
     def mload(self, orig=None):
         if isinstance(orig, Variable):
             self.push(orig.addr)
         else:
             self._push_if_not_none(orig)
-        self.ops.append(ops_by_name["MLOAD"])
+        self._emit(ops_by_name["MLOAD"])
 
     def mstore(self, dest=None, value=None):
         if isinstance(dest, Variable):
@@ -110,14 +158,14 @@ class ProgramSegment:
                 for vr, vl in dest.zip(value):
                     self.push(vl)
                     self.push(vr.addr)
-                    self.ops.append(ops_by_name["MSTORE"])
+                    self._emit(ops_by_name["MSTORE"])
             else:
                 self._push_if_not_none(value)
                 self.push(dest.addr)
-                self.ops.append(ops_by_name["MSTORE"])
+                self._emit(ops_by_name["MSTORE"])
         else:
             self._push_if_not_none(dest, value)
-            self.ops.append(ops_by_name["MSTORE"])
+            self._emit(ops_by_name["MSTORE"])
             
     def return_(self, orig=None, size=None):
         if isinstance(orig, Variable):
@@ -125,9 +173,16 @@ class ProgramSegment:
             self.push(orig.addr)
         else:
             self._push_if_not_none(orig, size)
-        self.ops.append(ops_by_name["RETURN"])
+        self._emit(ops_by_name["RETURN"])
+
+    def revert(self, orig=None, size=None):
+        self._push_if_not_none(orig, size)
+        self._emit(ops_by_name["REVERT"])
 
     def push(self, x=None):
+        if isinstance(x, Label):
+            self._emit(ops_by_name[LABEL_PUSH].set_arg(x))
+            return
         if x is None:
             x = Hex(-1)
         if isinstance(x, int):
@@ -137,68 +192,77 @@ class ProgramSegment:
                                  f"{x} is {x.nbytes()} bytes, max is 32")
         name = f"PUSH{x.nbytes()}"
         op = ops_by_name[name].set_arg(x)
-        self.ops.append(op)
+        self._emit(op)
 
     def dup(self, x=1):
         if x not in range(1, 17):
             raise ValueError(f"Dup index out of bounds: must be 1..16, "
                              f"passed {x}")
-        self.ops.append(ops_by_name[f"DUP{x}"])
+        self._emit(ops_by_name[f"DUP{x}"])
 
     def swap(self, x=1):
         if x not in range(1, 17):
             raise ValueError(f"Swap index out of bounds: must be 1..16, "
                              f"passed {x}")
-        self.ops.append(ops_by_name[f"SWAP{x}"])
+        self._emit(ops_by_name[f"SWAP{x}"])
 
     def jump(self, dest=None):
         if isinstance(dest, Variable):
             self.mload(dest)
-            self.ops.append(ops_by_name["JUMP"])
+            self._emit(ops_by_name["JUMP"])
         elif dest is not None:
             self.push(dest)
-            self.ops.append(ops_by_name["JUMP"])
+            self._emit(ops_by_name["JUMP"])
+
+    def jumpi(self, dest=None, cond=None):
+        self._push_if_not_none(dest, cond)
+        self._emit(ops_by_name["JUMPI"])
 
-    def jumpdest(self):
-        self.ops.append(ops_by_name["JUMPDEST"])
+    def jumpdest(self, label=None):
+        """JUMPDEST, defining `label` if passed"""
+        op = ops_by_name["JUMPDEST"]
+        self._emit(op if label is None else op.set_arg(label))
 
     def call(self, rp, to):
-        return_addr = Hex(self.offset + len(self)
-                          + to.nbytes() + rp.addr.nbytes() + 5)
-        temp_size = return_addr.nbytes() 
-        return_addr = Hex(return_addr + temp_size)
-        if Hex(return_addr).nbytes() > temp_size:
-            return_addr = Hex(return_addr + 1)
-        self.mstore(dest=rp, value=return_addr)
+        """Jump to `to`, the return address being stored at `rp`"""
+        self.n_calls += 1
+        ret = Label(f"{to.name}.ret{self.n_calls}")
+        self.mstore(dest=rp, value=ret)
         self.jump(to)
-        self.jumpdest()
+        self.jumpdest(ret)
 
     def pop(self):
-        self.ops.append(ops_by_name["POP"])
+        self._emit(ops_by_name["POP"])
 
     def setmodx(self, modulus):
         # self.push(modulus.addr + self.memory.size_max * 8)
         # self.push(modulus.addr)
         self.push(self.memory.size_max)
         self.push(modulus.addr)
-        self.ops.append(ops_by_name["SETMODX"])
+        self._emit(ops_by_name["SETMODX"])
+
+    def _slots(self, *variables):
+        arg = 0
+        for var in variables:
+            slot = self.memory.slot(var)
+            if not 0 <= slot <= 0xff:
+                raise ValueError(f"EVMMAX slot out of range: {var.name} "
+                                 f"is at slot {slot}, max is 255")
+            arg = (arg << 8) | slot
+        return Hex(arg)
 
     def addmodx(self, dest, x, y):
-        op = ops_by_name["ADDMODX"]
-        args = "".join([
-            str(self.memory.slot(dest)), 
-            str(self.memory.slot(x)), 
-            str(self.memory.slot(y)),
-        ])
-        op = op.set_arg(Hex(args))
-        self.ops.append(op)
+        op = ops_by_name["ADDMODX"].set_arg(self._slots(dest, x, y))
+        self._emit(op)
+
+    def submodx(self, dest, x, y):
+        op = ops_by_name["SUBMODX"].set_arg(self._slots(dest, x, y))
+        self._emit(op)
 
     def mulmontx(self, dest, x, y):
-        op = ops_by_name["MULMONTX"]
-        args = "".join([
-            str(self.memory.slot(dest)), 
-            str(self.memory.slot(x)), 
-            str(self.memory.slot(y)),
-        ])
-        op = op.set_arg(Hex(args))
-        self.ops.append(op)
+        op = ops_by_name["MULMONTX"].set_arg(self._slots(dest, x, y))
+        self._emit(op)
+
+    def tomontx(self, x):
+        self.push(self.memory.slot(x))
+        self._emit(ops_by_name["TOMONTX"])
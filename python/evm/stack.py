@@ -0,0 +1,55 @@
+class Stack:
+    """Symbolic view of the EVM stack, to reach values by name
+
+    Items are listed bottom to top. Generators keep values on the stack and
+    let `dup`/`to_top` compute the DUP/SWAP indices as the stack moves.
+    """
+    def __init__(self, segment, items=()):
+        self.segment = segment
+        self.items = list(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def depth(self, name) -> int:
+        for d, item in enumerate(reversed(self.items), 1):
+            if item == name:
+                return d
+        raise KeyError(f"{name} is not on the stack")
+
+    def dup(self, name, alias=None):
+        d = self.depth(name)
+        if d > 16:
+            raise ValueError(f"{name} is too deep to DUP: depth {d}")
+        self.segment.dup(d)
+        self.items.append(name if alias is None else alias)
+
+    def swap(self, n):
+        self.segment.swap(n)
+        self.items[-1], self.items[-n - 1] = self.items[-n - 1], self.items[-1]
+
+    def to_top(self, name):
+        d = self.depth(name)
+        if d > 17:
+            raise ValueError(f"{name} is too deep to SWAP: depth {d}")
+        if d > 1:
+            self.swap(d - 1)
+
+    def push(self, value, name):
+        self.segment.push(value)
+        self.items.append(name)
+
+    def op(self, emit, n_in, name=None):
+        """Emit an op consuming the n_in top items and pushing name"""
+        emit()
+        del self.items[len(self.items) - n_in:]
+        if name is not None:
+            self.items.append(name)
+
+    def rename(self, old, new):
+        self.items[len(self.items) - self.depth(old)] = new
+
+    def drop(self, name):
+        self.to_top(name)
+        self.segment.pop()
+        self.items.pop()
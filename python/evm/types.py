@@ -1,111 +1,50 @@
-from typing import Union
+class Hex(int):
+    """Integer printed as big-endian hex bytes, e.g. for op arguments
 
+    Negative values stand for a missing argument and print empty.
+    Arithmetic returns plain ints: wrap the result where it is printed.
+    """
+    __slots__ = ()
 
-class Hex():
-    def __init__(self, value: Union[int, str]):
-        if isinstance(value, Hex):
-            self._value = value._value
-        elif isinstance(value, str):
-            self._value = int(value, base=16)
-        else:
-            self._value = value
+    def __new__(cls, value=0):
+        if isinstance(value, str):
+            return super().__new__(cls, value, 16)
+        return super().__new__(cls, value)
 
     def __repr__(self):
-        if self._value < 0:
+        if self < 0:
             return ""
-        t = hex(self._value)[2:]
-        return "0" + t if len(t) % 2 else t
+        return format(self, f"0{2 * self.nbytes()}x")
 
-    def __add__(self, other):
-        x = self._value
-        if isinstance(other, Hex):
-            x += other._value
-        else:
-            x += other
-        return self.__class__(x)
+    __str__ = __repr__
 
-    def __radd__(self, other):
-        return self + other
-
-    def __sub__(self, other):
-        x = self._value
-        if isinstance(other, Hex):
-            x -= other._value
-        else:
-            x -= other
-        return self.__class__(x)
-
-    def __rsub__(self, other):
-        return self - other
-
-    def __mul__(self, other):
-        x = self._value
-        if isinstance(other, Hex):
-            x *= other._value
-        else:
-            x *= other
-        return self.__class__(x)
-
-    def __rmul__(self, other):
-        return self + other
-
-    def __floordiv__(self, other):
-        x = self._value
-        if isinstance(other, Hex):
-            x = x // other._value
-        else:
-            x = x // other
-        return self.__class__(x)
-
-    def __rfloordiv__(self, other):
-        return self // other
-
-    def __lt__(self, other):
-        return (
-            self._value < other._value if isinstance(other, Hex) else
-            self._value < other
-        )
-
-    def __le__(self, other):
-        return (
-            self._value <= other._value if isinstance(other, Hex) else
-            self._value <=other
-        )
-
-    def __gt__(self, other):
-        return (
-            self._value > other._value if isinstance(other, Hex) else
-            self._value > other
-        )
+    def to_hex(self, zfill=1):
+        if self < 0:
+            return "00" * zfill
+        return format(self, f"0{2 * max(zfill, self.nbytes())}x")
 
-    def __ge__(self, other):
-        return (
-            self._value >= other._value if isinstance(other, Hex) else
-            self._value >= other
-        )
+    def to_le(self, zfill=1):
+        if self < 0:
+            return self.__class__(0)
+        n = max(zfill, self.nbytes())
+        return self.__class__(
+            int.from_bytes(self.to_bytes(n, "big"), "little"))
 
-    def __eq__(self, other):
-        return (
-            self._value == other._value if isinstance(other, Hex) else
-            self._value == other
-        )
+    def nbytes(self) -> int:
+        if self < 0:
+            return 0
+        return max(1, (self.bit_length() + 7) // 8)
 
-    def __neq__(self, other):
-        return (
-            self._value != other._value if isinstance(other, Hex) else
-            self._value != other
-        )
 
-    def to_hex(self, zfill=1):
-        return str(self).zfill(zfill * 2)
+class Label:
+    """Symbolic code offset, resolved when the program is assembled
 
-    def to_le(self, zfill=1):
-        res = []
-        hs = self.to_hex(zfill=zfill)
-        for a, b in zip(hs[::2], hs[1::2]):
-            res.insert(0, a+b)
-        return self.__class__("".join(res))
+    Labels compare by identity: two labels of the same name are distinct.
+    """
+    __slots__ = ("name",)
 
-    def nbytes(self) -> int:
-        return len(str(self)) // 2
+    def __init__(self, name: str):
+        self.name = name
 
+    def __repr__(self):
+        return f"Label({self.name!r})"
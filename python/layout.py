@@ -0,0 +1,117 @@
+def round_groups(start, stop, k):
+    """Calls running rounds start to stop - 1 through a body of k rounds
+
+    Returns (entry, rounds) pairs, the body being entered at its round
+    `entry`: a remainder of fewer than k rounds runs first, entering the
+    body past its first rounds.
+    """
+    r = (stop - start) % k
+    groups = []
+    if r:
+        groups.append((k - r, list(range(start, start + r))))
+    for s in range(start + r, stop, k):
+        groups.append((0, list(range(s, s + k))))
+    return groups
+
+
+def require_blocks(seg, rate, ok):
+    """Revert unless the byte size on the stack is a positive multiple of
+    rate words, otherwise continue at `ok`"""
+    seg.push(32 * rate)
+    seg.dup(2)
+    seg.mod()
+    seg.swap(1)
+    seg.iszero()
+    seg.or_()
+    seg.iszero()
+    seg.jumpi(ok)
+    seg.revert(0, 0)
+    seg.jumpdest(ok)
+
+
+def load_batch_input(seg, state, rate, ctr):
+    """Copy the input at calldata offset `ctr` to the rate lanes of state,
+    clearing its capacity lanes"""
+    seg.push(state[:rate].m_size)
+    seg.mload(ctr)
+    seg.push(state.addr)
+    seg.calldatacopy()
+    for j in range(rate, state.shape[0]):
+        seg.mstore(state[j], 0)
+
+
+def store_batch_output(seg, state, rate, ctr, out, loop):
+    """Copy the rate lanes of state to `out` at offset `ctr`, then jump
+    back to `loop` for the next input, or return all outputs
+
+    Inputs and outputs being of rate words, outputs are as long as the
+    calldata.
+    """
+    for j in range(rate):
+        seg.mload(state[j])
+        seg.mload(ctr)
+        seg.add(out.addr + 32 * j)
+        seg.mstore()
+    seg.mload(ctr)
+    seg.add(32 * rate)
+    seg.dup(1)
+    seg.mstore(ctr)
+    seg.calldatasize()
+    seg.gt()
+    seg.jumpi(loop)
+    seg.calldatasize()
+    seg.return_(out.addr)
+
+
+def length_tag(n_outputs):
+    """Capacity value of variable-length hashing (Poseidon paper, 4.2)"""
+    return 2 ** 64 + n_outputs - 1
+
+
+def pad_message(seg, msg, end, ok):
+    """Copy calldata to `msg` followed by a word 1 (the 10* padding, the
+    zeros being those of fresh memory). `end` gets the offset past the
+    word 1.
+
+    Calldata that is not a whole number of words reverts, otherwise
+    execution continues at `ok`: a zero-filled last word would hash as the
+    message with trailing zero bytes.
+    """
+    seg.push(32)
+    seg.calldatasize()
+    seg.mod()
+    seg.iszero()
+    seg.jumpi(ok)
+    seg.revert(0, 0)
+    seg.jumpdest(ok)
+    seg.calldatasize()
+    seg.push(0)
+    seg.push(msg.addr)
+    seg.calldatacopy()
+    seg.push(1)
+    # end = calldatasize + 32
+    seg.calldatasize()
+    seg.add(32)
+    seg.dup(1)
+    seg.mstore(end)
+    seg.add(msg.addr - 32)
+    seg.mstore()
+
+
+def load_block_word(seg, msg, ctr, j):
+    """Push word j of the block at offset `ctr` of msg"""
+    seg.mload(ctr)
+    seg.add(msg.addr + 32 * j)
+    seg.mload()
+
+
+def next_block(seg, rate, ctr, end, loop):
+    """Advance `ctr` by a block, jumping back to `loop` while the padded
+    message has blocks left"""
+    seg.mload(end)
+    seg.mload(ctr)
+    seg.add(32 * rate)
+    seg.dup(1)
+    seg.mstore(ctr)
+    seg.lt()
+    seg.jumpi(loop)
@@ -0,0 +1,209 @@
+"""Poseidon parameters for a prime field, width and S-box exponent
+
+Round numbers, round constants (Grain LFSR) and the Cauchy MDS matrix
+follow the reference scripts of the Poseidon paper. Parameters are written
+in the format of params/*.json, MDS matrix and round constants in
+Montgomery form, to a cache keyed by a hash of the inputs.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+
+from .params import export_parameters_binary
+
+# Bump when the output of generate changes, to invalidate cached files
+VERSION = 1
+CACHE_DIR = Path(__file__).resolve().parent.parent / "params" / "cache"
+
+
+def _secure(p, t, n_full, n_partial, alpha, security):
+    """Security inequalities of the reference calc_round_numbers script"""
+    n = math.ceil(math.log2(p))
+    log_p = math.log2(p)
+    r_f = max(
+        # Statistical
+        6 if security <= math.floor(log_p - (alpha - 1) / 2) * (t + 1)
+        else 10,
+        # Interpolation
+        1 + math.ceil(math.log(2, alpha) * min(security, n))
+        + math.ceil(math.log(t, alpha)) - n_partial,
+        # Groebner basis
+        math.ceil(math.log(2, alpha) * min(security, log_p) - n_partial),
+        math.ceil(t - 1 + math.log(2, alpha)
+                  * min(security / (t + 1), log_p / 2) - n_partial),
+        math.ceil((t - 2 + security / (2 * math.log2(alpha)) - n_partial)
+                  / (t - 1)),
+    )
+    # Groebner basis, from eprint 2023/537
+    r = t // 3
+    over = ((n_full - 1) * t + n_partial + r + r * n_full / 2
+            + n_partial + alpha)
+    under = r * n_full / 2 + n_partial + alpha
+    binom_log = (math.lgamma(over + 1) - math.lgamma(under + 1)
+                 - math.lgamma(over - under + 1)) / math.log(2)
+    return n_full >= r_f and math.ceil(2 * binom_log) >= security
+
+
+def round_numbers(p, t, alpha, security=128, margin=True):
+    """Full and partial round numbers minimising the number of S-boxes
+
+    With `margin`, 2 full rounds and 7.5% partial rounds are added, as
+    recommended.
+    """
+    best, cost = None, math.inf
+    for n_partial in range(1, 500):
+        for n_full in range(4, 100, 2):
+            if not _secure(p, t, n_full, n_partial, alpha, security):
+                continue
+            # The reference script keeps the margin on n_partial for the
+            # remaining n_full: kept as is, to reproduce its round numbers
+            if margin:
+                n_full += 2
+                n_partial = math.ceil(n_partial * 1.075)
+            c = n_full * t + n_partial
+            if c < cost or (c == cost and n_full < best[0]):
+                best, cost = (n_full, n_partial), c
+    return best
+
+
+class Grain:
+    """Grain LFSR in self-shrinking mode, seeded with the instance"""
+    def __init__(self, n, t, n_full, n_partial, field=1, sbox=0):
+        seed = (f"{field:02b}{sbox:04b}{n:012b}{t:012b}"
+                f"{n_full:010b}{n_partial:010b}" + "1" * 30)
+        self.state = [int(b) for b in seed]
+        for _ in range(160):
+            self._next()
+
+    def _next(self):
+        s = self.state
+        bit = s[62] ^ s[51] ^ s[38] ^ s[23] ^ s[13] ^ s[0]
+        s.pop(0)
+        s.append(bit)
+        return bit
+
+    def bit(self):
+        while not self._next():
+            self._next()
+        return self._next()
+
+    def bits(self, n) -> int:
+        x = 0
+        for _ in range(n):
+            x = (x << 1) | self.bit()
+        return x
+
+    def field_element(self, p, n) -> int:
+        """Uniform element of GF(p), by rejection"""
+        x = self.bits(n)
+        while x >= p:
+            x = self.bits(n)
+        return x
+
+
+def cauchy_mds(grain, p, n, t):
+    """MDS matrix 1 / (x_i + y_j) for distinct random x and y"""
+    while True:
+        xy = [grain.bits(n) % p for _ in range(2 * t)]
+        while len(set(xy)) != 2 * t:
+            xy = [grain.bits(n) % p for _ in range(2 * t)]
+        xs, ys = xy[:t], xy[t:]
+        if all((x + y) % p for x in xs for y in ys):
+            return [[pow(x + y, -1, p) for y in ys] for x in xs]
+
+
+def generate(prime, size, alpha, rate=None, security=128, limbs=4,
+             rounds=None):
+    """Parameters as in params/*.json; Montgomery R is 2**(64 * limbs)
+
+    `rounds` = (n_full, n_partial) overrides the computed round numbers,
+    e.g. to match instances rounding n_partial up to a multiple of size.
+    The MDS matrix is not screened for the subspace trails of the reference
+    script: check it for instances other than the usual small widths.
+    """
+    p = prime
+    if alpha < 3 or math.gcd(alpha, p - 1) != 1:
+        raise ValueError(f"x^{alpha} is not a permutation of GF({p:#x})")
+    if p.bit_length() > 64 * limbs:
+        raise ValueError(f"Modulus does not fit in {limbs} limbs")
+    n = p.bit_length()
+    n_full, n_partial = rounds or round_numbers(p, size, alpha, security)
+
+    grain = Grain(n, size, n_full, n_partial)
+    rks = [[grain.field_element(p, n) for _ in range(size)]
+           for _ in range(n_full + n_partial)]
+    mds = cauchy_mds(grain, p, n, size)
+
+    r = pow(2, 64 * limbs, p)
+    return {
+        "rate": size - 1 if rate is None else rate,
+        "size": size,
+        "n_full_rounds": n_full,
+        "n_partial_rounds": n_partial,
+        "modulus": hex(p),
+        "montR": hex(r),
+        "montR2": hex(r * r % p),
+        "montRinv": hex(pow(r, -1, p)),
+        "sbox": alpha,
+        "mds": [[hex(x * r % p) for x in row] for row in mds],
+        "rks": [[hex(x * r % p) for x in row] for row in rks],
+    }
+
+
+def cache_path(prime, size, alpha, rate=None, security=128, limbs=4,
+               rounds=None, cache_dir=CACHE_DIR, binary=False) -> Path:
+    spec = {"version": VERSION, "prime": hex(prime), "size": size,
+            "alpha": alpha, "rate": rate, "security": security,
+            "limbs": limbs, "rounds": rounds and list(rounds)}
+    key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    suffix = ".bin" if binary else ".json"
+    return Path(cache_dir) / f"{key.hexdigest()[:32]}{suffix}"
+
+
+def cached(prime, size, alpha, rate=None, security=128, limbs=4,
+           rounds=None, cache_dir=CACHE_DIR, binary=False) -> Path:
+    """Path to the parameters of the instance, generated on first use
+
+    The file loads with load_parameters; JSON files also with
+    import_parameters or import_parameters_as_le.
+    """
+    path = cache_path(prime, size, alpha, rate, security, limbs, rounds,
+                      cache_dir, binary)
+    if not path.exists():
+        params = generate(prime, size, alpha, rate, security, limbs, rounds)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        if binary:
+            with open(tmp, "wb") as f:
+                export_parameters_binary(params, f)
+        else:
+            with open(tmp, "w") as f:
+                json.dump(params, f, indent=2)
+        os.replace(tmp, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate Poseidon parameters, print their cached path")
+    parser.add_argument("prime", type=lambda x: int(x, 0))
+    parser.add_argument("--size", type=int, default=3)
+    parser.add_argument("--alpha", type=int, default=5)
+    parser.add_argument("--rate", type=int, default=None)
+    parser.add_argument("--security", type=int, default=128)
+    parser.add_argument("--rounds", type=int, nargs=2, default=None,
+                        metavar=("N_FULL", "N_PARTIAL"))
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--binary", action="store_true",
+                        help="write the binary format, see python/params.py")
+    args = parser.parse_args(argv)
+    print(cached(args.prime, args.size, args.alpha, args.rate, args.security,
+                 rounds=args.rounds, cache_dir=args.cache_dir,
+                 binary=args.binary))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+from collections.abc import Sequence
 import json
+import mmap
+import struct
 
 from .evm.types import Hex
 
@@ -23,3 +26,113 @@ def import_parameters_as_le(f):
     params["mds"] = [[Hex(x).to_le(zfill=32) for x in row] for row in params["mds"]]
     params["rks"] = [[Hex(x).to_le(zfill=32) for x in row] for row in params["rks"]]
     return params
+
+
+# Binary format: a header, then 32-byte words in the header's byte order:
+# modulus, montR, montR2, montRinv, mds (row major), rks (row major)
+MAGIC = b"PSDN"
+VERSION = 1
+HEADER = struct.Struct(">4sBB2xHHHHQ")
+WORD = 32
+SCALARS = ("modulus", "montR", "montR2", "montRinv")
+BYTEORDERS = ("big", "little")
+
+
+class Rows(Sequence):
+    """Rows of 32-byte words in a buffer, decoded to ints on first access"""
+    def __init__(self, buf, offset, n_rows, n_cols, byteorder):
+        self.buf = buf
+        self.offset = offset
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.byteorder = byteorder
+        self._rows = {}
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(self.n_rows))]
+        if i < 0:
+            i += self.n_rows
+        if not 0 <= i < self.n_rows:
+            raise IndexError(f"Row index out of range: {i}")
+        row = self._rows.get(i)
+        if row is None:
+            start = self.offset + i * self.n_cols * WORD
+            row = [int.from_bytes(self.buf[o:o + WORD], self.byteorder)
+                   for o in range(start, start + self.n_cols * WORD, WORD)]
+            self._rows[i] = row
+        return row
+
+
+def export_parameters_binary(params, f, byteorder="big"):
+    """Write params, as loaded by import_parameters or in their JSON form,
+    in the binary format"""
+    size = params["size"]
+    n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
+    if len(params["rks"]) != n_rounds:
+        raise ValueError(f"Expected {n_rounds} rows of round constants, "
+                         f"passed {len(params['rks'])}")
+    f.write(HEADER.pack(MAGIC, VERSION, BYTEORDERS.index(byteorder),
+                        params["rate"], size, params["n_full_rounds"],
+                        params["n_partial_rounds"], params["sbox"]))
+    values = [params[k] for k in SCALARS]
+    for rows in (params["mds"], params["rks"]):
+        for row in rows:
+            if len(row) != size:
+                raise ValueError(f"Expected rows of {size} values, "
+                                 f"passed {len(row)}")
+            values.extend(row)
+    for x in values:
+        f.write(int(Hex(x)).to_bytes(WORD, byteorder))
+
+
+def import_parameters_binary(path, as_le=False):
+    """Parameters from a binary file, read through a memory map
+
+    Scalars are decoded at once, MDS and round constant rows when touched.
+    With `as_le`, values are byte-reversed as by import_parameters_as_le.
+    """
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) < HEADER.size or buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a binary parameter file")
+    (_, version, order, rate, size, n_full, n_partial,
+     sbox) = HEADER.unpack_from(buf)
+    if version != VERSION:
+        raise ValueError(f"Unsupported parameter file version {version}")
+    n_rounds = n_full + n_partial
+    n_words = len(SCALARS) + size * size + n_rounds * size
+    if len(buf) != HEADER.size + n_words * WORD:
+        raise ValueError(f"{path} is truncated or has trailing data")
+
+    byteorder = BYTEORDERS[order]
+    if as_le:
+        byteorder = BYTEORDERS[1 - order]
+    scalars = Rows(buf, HEADER.size, 1, len(SCALARS), byteorder)[0]
+    mds_offset = HEADER.size + len(SCALARS) * WORD
+    params = {
+        "rate": rate,
+        "size": size,
+        "n_full_rounds": n_full,
+        "n_partial_rounds": n_partial,
+        "sbox": sbox,
+        "mds": Rows(buf, mds_offset, size, size, byteorder),
+        "rks": Rows(buf, mds_offset + size * size * WORD, n_rounds, size,
+                    byteorder),
+    }
+    params.update((k, Hex(x)) for k, x in zip(SCALARS, scalars))
+    return params
+
+
+def load_parameters(path, as_le=False):
+    """Parameters from a JSON or a binary file"""
+    with open(path, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        return import_parameters_binary(path, as_le)
+    with open(path) as f:
+        return import_parameters_as_le(f) if as_le else import_parameters(f)
+
@@ -1,145 +1,248 @@
 import json
 
-from .evm import Program, Hex
+from .evm import Program, Hex, Label
+from .evm.stack import Stack
 from .params import import_parameters
+from .sbox import addition_chain, mulmod_chain
+from .layout import (length_tag, load_batch_input, load_block_word,
+                     next_block, pad_message, require_blocks,
+                     round_groups, store_batch_output)
+from .transform import absorb_constants, sparse_partial_rounds
 
 
-def program(params):
-    if params["sbox"] not in [3]:
-        raise NotImplementedError(f"Sbox {params['sbox']} is not yet supported.")
-    
+# Values of the options of program, searched by the autotuner
+KNOBS = {
+    "sparse": (False, True),
+    "absorb": (False, True),
+    "rounds_per_call": (1, 2, 4, 8, 16, 32),
+}
+
+
+def program(params, sparse=False, absorb=True, rounds_per_call=1,
+            batch=False, variable_length=False):
+    """`rounds_per_call` consecutive rounds of a kind run in one call,
+    their constants being stored in a table beforehand
+
+    With `batch`, calldata holds one or more rate-word inputs, hashed in a
+    loop after a single setup, and the outputs are returned in order.
+    Other calldata sizes revert.
+    With `variable_length`, calldata is a message of any number of words,
+    padded and absorbed rate words per permutation, and the rate words of
+    the final state are returned. A partial last word reverts.
+    """
     lim_full = (params["n_full_rounds"] // 2)
     lim_partial = lim_full + params["n_partial_rounds"]
     n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
-    sbox_n_mods = 2 if params["sbox"] == 3 else 3
+    chain = addition_chain(params["sbox"])
+    # Constants of lanes without Sbox move to the next round, which must exist
+    absorb = absorb and lim_partial < n_rounds
+    if batch and variable_length:
+        raise ValueError("Batch and variable-length modes are exclusive")
+    if variable_length and params["rate"] >= params["size"]:
+        raise ValueError("Variable-length mode needs a capacity lane")
+    if rounds_per_call < 1:
+        raise ValueError(f"Rounds per call must be positive: "
+                         f"passed {rounds_per_call}")
+
+    # Calls as (body, entry round in the body, rounds)
+    runs = [("full", 0, lim_full)]
+    if sparse:
+        # Only the first partial round keeps a dense matrix
+        runs += [("partial", lim_full, lim_full + 1),
+                 ("sparse", lim_full + 1, lim_partial)]
+    else:
+        runs += [("partial", lim_full, lim_partial)]
+    runs += [("full", lim_partial, n_rounds)]
+    n_body = {}
+    for kind, start, stop in runs:
+        n_body[kind] = max(n_body.get(kind, 1),
+                           min(rounds_per_call, stop - start))
+    calls = [(kind, entry, rounds) for kind, start, stop in runs
+             for entry, rounds in round_groups(start, stop, n_body[kind])]
+    n_table = max(n_body.values())
     
     pgr = Program()
+    labels = {(kind, entry): Label(f"{kind}.{entry}")
+              for kind, entry, _ in calls}
+    for kind in ("partial", "full", "sparse"):
+        labels.setdefault((kind, 0), Label(f"{kind}.0"))
+    labels["sponge"] = Label("sponge")
+    labels["loop"] = Label("loop")
+    labels["valid"] = Label("valid")
     mod = pgr.memory.alloc("modulus")
     state = pgr.memory.alloc("state", shape=(params["size"],))
     temp = pgr.memory.alloc("temp", shape=(params["size"],))
     mds = pgr.memory.alloc("mds", shape=(params["size"], params["size"]))
-    rk = pgr.memory.alloc("rk", shape=(params["size"],))
+    rk = pgr.memory.alloc("rk", shape=(n_table, params["size"]))
     fp = pgr.memory.alloc("fp")  # need only one return point
+    if sparse:
+        sp = sparse_partial_rounds(params)
+        mds0 = pgr.memory.alloc("mds0", shape=(params["size"], params["size"]))
+        row = pgr.memory.alloc("row", shape=(n_body["sparse"], params["size"]))
+        col = pgr.memory.alloc("col", shape=(n_body["sparse"],
+                                             params["size"] - 1))
+    rks = params["rks"]
+    if sparse:
+        rks = rks[:lim_full] + sp.rks + rks[lim_partial:]
+    if absorb:
+        rks = absorb_constants(params, sparse=sp if sparse else None)
+    if batch:
+        ctr = pgr.memory.alloc("ctr")  # calldata offset of the input
+        out = pgr.memory.alloc("out")  # outputs from here, last allocated
+    if variable_length:
+        ctr = pgr.memory.alloc("ctr")  # offset of the block in msg
+        end = pgr.memory.alloc("end")  # offset past the padded message
+        msg = pgr.memory.alloc("msg")  # message from here, last allocated
     
-    partial = pgr.segment("permute_partial")
-    partial.jumpdest()
-    # Top stack = params["modulus"], dup to avoid reloading
-    for _ in range(1 + sbox_n_mods):
-        partial.dup(1)
-    # Ark
-    partial.mload(rk[0])
-    partial.mload(state[0])
-    partial.addmod()
-    # Sbox
-    partial.swap(1)
-    partial.dup(2)
-    partial.dup(1)
-    partial.mulmod()
-    partial.mulmod()
-    partial.mstore(temp[0])
-    for j in range(1, params["size"]):
+    def ark_sbox_partial(partial, rk):
         # Top stack = params["modulus"], avoid consuming it
         partial.dup(1)
         # Ark
-        partial.mload(rk[j])
-        partial.mload(state[j])
+        partial.mload(rk[0])
+        partial.mload(state[0])
         partial.addmod()
-        # No Sbox
-        partial.mstore(temp[j])
-    # Mix
-    for j in range(params["size"]):
-        # Top stack = params["modulus"], avoid consuming it
-        for _ in range(2 * params["size"] - 1):
+        # Sbox
+        mulmod_chain(Stack(partial, ["modulus", "x"]), chain, "x", "y")
+        partial.mstore(temp[0])
+        for j in range(1, params["size"]):
+            if absorb:
+                # No Ark, no Sbox
+                partial.mload(state[j])
+                partial.mstore(temp[j])
+                continue
+            # Top stack = params["modulus"], avoid consuming it
             partial.dup(1)
-        for k in range(params["size"]):
-            partial.mload(mds[j][k])
-            partial.mload(temp[k])
-            partial.mulmod()
-            n_sw = 2 * params["size"] - 2 * k - 3
-            if n_sw > 0:
-                partial.swap(n_sw)
-        for _ in range(params["size"] - 1):
+            # Ark
+            partial.mload(rk[j])
+            partial.mload(state[j])
             partial.addmod()
-        partial.mstore(state[j])
-    partial.jump(fp)
-    
-    full = pgr.segment("permute_full")
-    full.jumpdest()
-    for j in range(params["size"]):
-        # Top stack = params["modulus"], avoid consuming it
-        for _ in range(1 + sbox_n_mods):
+            # No Sbox
+            partial.mstore(temp[j])
+
+    def mix(seg, mds):
+        for j in range(params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
+            for _ in range(2 * params["size"] - 1):
+                seg.dup(1)
+            for k in range(params["size"]):
+                seg.mload(mds[j][k])
+                seg.mload(temp[k])
+                seg.mulmod()
+                n_sw = 2 * params["size"] - 2 * k - 3
+                if n_sw > 0:
+                    seg.swap(n_sw)
+            for _ in range(params["size"] - 1):
+                seg.addmod()
+            seg.mstore(state[j])
+
+    def permute_partial(partial, i):
+        ark_sbox_partial(partial, rk[i])
+        mix(partial, mds0 if sparse else mds)
+
+    def permute_full(full, i):
+        for j in range(params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
             full.dup(1)
-        # Ark
-        full.mload(rk[j])
-        full.mload(state[j])
-        full.addmod()
-        # Sbox
-        full.swap(1)
-        full.dup(2)
-        full.dup(1)
-        full.mulmod()
-        full.mulmod()
-        full.mstore(temp[j])
-    # Mix
-    for j in range(params["size"]):
-        # Top stack = params["modulus"], avoid consuming it
+            # Ark
+            full.mload(rk[i][j])
+            full.mload(state[j])
+            full.addmod()
+            # Sbox
+            mulmod_chain(Stack(full, ["modulus", "x"]), chain, "x", "y")
+            full.mstore(temp[j])
+        mix(full, mds)
+
+    def permute_sparse(spr, i):
+        # First row, first column and identity elsewhere
+        ark_sbox_partial(spr, rk[i])
         for _ in range(2 * params["size"] - 1):
-            full.dup(1)
+            spr.dup(1)
         for k in range(params["size"]):
-            full.mload(mds[j][k])
-            full.mload(temp[k])
-            full.mulmod()
+            spr.mload(row[i][k])
+            spr.mload(temp[k])
+            spr.mulmod()
             n_sw = 2 * params["size"] - 2 * k - 3
             if n_sw > 0:
-                full.swap(n_sw)
+                spr.swap(n_sw)
         for _ in range(params["size"] - 1):
-            full.addmod()
-        full.mstore(state[j])
-    full.jump(fp)
-    
-    # Static analysis for jumpdests
-    sponge_jumpdest = 2 + len(full) + len(partial)
-    sponge_jumpdest_size = Hex(sponge_jumpdest).nbytes()
-    sponge_jumpdest = Hex(sponge_jumpdest + sponge_jumpdest_size)
-    if sponge_jumpdest.nbytes() > sponge_jumpdest_size:
-        sponge_jumpdest = Hex(sponge_jumpdest + 1)
+            spr.addmod()
+        spr.mstore(state[0])
+        for j in range(1, params["size"]):
+            spr.dup(1)
+            spr.dup(1)
+            spr.mload(col[i][j - 1])
+            spr.mload(temp[0])
+            spr.mulmod()
+            spr.mload(temp[j])
+            spr.addmod()
+            spr.mstore(state[j])
+
+    def body(kind, permute):
+        seg = pgr.segment(f"permute_{kind}")
+        for i in range(n_body.get(kind, 1)):
+            if (kind, i) in labels:
+                seg.jumpdest(labels[kind, i])
+            permute(seg, i)
+        seg.jump(fp)
+        return seg
+
+    partial = body("partial", permute_partial)
+    full = body("full", permute_full)
+    if sparse:
+        spr = body("sparse", permute_sparse)
     
     main = pgr.segment("main")
-    main.jump(sponge_jumpdest)
-    
-    jumpdests = {
-        "partial": Hex(len(main)),
-        "full": Hex(len(main) + len(partial)),
-        "sponge": sponge_jumpdest,
-    }
-    
-    sponge = pgr.segment("sponge")
+    main.jump(labels["sponge"])
 
-    # We know all code offsets for jumps.
-    partial.offset = Hex(len(main))
-    full.offset = Hex(len(main) + len(partial))
-    sponge.offset = sponge_jumpdest
-    
-    sponge.jumpdest()
+    sponge = pgr.segment("sponge")
+    sponge.jumpdest(labels["sponge"])
     sponge.mstore(dest=mod, value=params["modulus"])
-    sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
+    if variable_length:
+        pad_message(sponge, msg, end, labels["valid"])
+        sponge.mstore(state[params["rate"]], length_tag(params["rate"]))
+    elif not batch:
+        sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
     sponge.mstore(dest=mds, value=params["mds"])
+    if sparse:
+        sponge.mstore(dest=mds0, value=sp.first)
     sponge.mload(mod)  # Keep field params["modulus"] on stack, duplicated as needed
-    for i in range(lim_full):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["full"])
-    for i in range(lim_full, lim_partial):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["partial"])
-    for i in range(lim_partial, n_rounds):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["full"])
+    if batch:
+        sponge.calldatasize()
+        require_blocks(sponge, params["rate"], labels["valid"])
+        sponge.jumpdest(labels["loop"])
+        load_batch_input(sponge, state, params["rate"], ctr)
+    if variable_length:
+        sponge.jumpdest(labels["loop"])
+        for j in range(params["rate"]):
+            sponge.dup(1)
+            load_block_word(sponge, msg, ctr, j)
+            sponge.mload(state[j])
+            sponge.addmod()
+            sponge.mstore(state[j])
+    for kind, entry, rounds in calls:
+        for i, r in enumerate(rounds, entry):
+            if absorb and kind != "full":
+                sponge.mstore(rk[i][0], rks[r][0])
+            else:
+                sponge.mstore(rk[i], rks[r])
+            if kind == "sparse":
+                sponge.mstore(row[i], sp.rows[r - lim_full])
+                sponge.mstore(col[i], sp.cols[r - lim_full])
+        sponge.call(fp, labels[kind, entry])
     
     # sponge.pop()  # Remove modulus from stack
-    sponge.return_(state[:params["rate"]])
+    if variable_length:
+        next_block(sponge, params["rate"], ctr, end, labels["loop"])
+    if batch:
+        store_batch_output(sponge, state, params["rate"], ctr, out,
+                           labels["loop"])
+    else:
+        sponge.return_(state[:params["rate"]])
 
     pgr.ops.extend(main.ops)
     pgr.ops.extend(partial.ops)
     pgr.ops.extend(full.ops)
+    if sparse:
+        pgr.ops.extend(spr.ops)
     pgr.ops.extend(sponge.ops)
     return pgr
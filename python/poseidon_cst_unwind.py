@@ -0,0 +1,132 @@
+from .evm import Program, Hex
+from .evm.stack import Stack
+from .params import import_parameters
+from .sbox import addition_chain, mulmod_chain
+from .transform import sparse_partial_rounds
+
+
+# Values of the options of program, searched by the autotuner
+KNOBS = {"sparse": (False, True)}
+
+
+def program(params, sparse=False):
+    lim_full = (params["n_full_rounds"] // 2)
+    lim_partial = lim_full + params["n_partial_rounds"]
+    n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
+    chain = addition_chain(params["sbox"])
+    
+    pgr = Program()
+    state = pgr.memory.alloc("state", shape=(params["size"],))
+    temp = pgr.memory.alloc("temp", shape=(params["size"],))
+    if sparse:
+        sp = sparse_partial_rounds(params)
+    
+    def mix_sparse(partial, row, col):
+        # First row is dense
+        for _ in range(2 * params["size"] - 1):
+            partial.dup(1)
+        for k in range(params["size"]):
+            partial.push(row[k])
+            partial.mload(temp[k])
+            partial.mulmod()
+            n_sw = 2 * params["size"] - 2 * k - 3
+            if n_sw > 0:
+                partial.swap(n_sw)
+        for _ in range(params["size"] - 1):
+            partial.addmod()
+        partial.mstore(state[0])
+        # Other lanes: first column plus identity
+        for j in range(1, params["size"]):
+            partial.dup(1)
+            partial.dup(1)
+            partial.push(col[j - 1])
+            partial.mload(temp[0])
+            partial.mulmod()
+            partial.mload(temp[j])
+            partial.addmod()
+            partial.mstore(state[j])
+    
+    def permute_partial(partial, r):
+        rk, pmds = params["rks"][r], params["mds"]
+        if sparse:
+            # Only the first partial round keeps a dense matrix
+            rk, pmds = sp.rks[r - lim_full], sp.first
+        # Top stack = params["modulus"], avoid consuming it
+        partial.dup(1)
+        # Ark
+        partial.push(rk[0])
+        partial.mload(state[0])
+        partial.addmod()
+        # Sbox
+        mulmod_chain(Stack(partial, ["modulus", "x"]), chain, "x", "y")
+        partial.mstore(temp[0])
+        for j in range(1, params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
+            partial.dup(1)
+            # Ark
+            partial.push(rk[j])
+            partial.mload(state[j])
+            partial.addmod()
+            # No Sbox
+            partial.mstore(temp[j])
+        if sparse and r > lim_full:
+            i = r - lim_full
+            mix_sparse(partial, sp.rows[i], sp.cols[i])
+            return
+        # Mix
+        for j in range(params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
+            for _ in range(2 * params["size"] - 1):
+                partial.dup(1)
+            for k in range(params["size"]):
+                partial.push(pmds[j][k])
+                partial.mload(temp[k])
+                partial.mulmod()
+                n_sw = 2 * params["size"] - 2 * k - 3
+                if n_sw > 0:
+                    partial.swap(n_sw)
+            for _ in range(params["size"] - 1):
+                partial.addmod()
+            partial.mstore(state[j])
+    
+    def permute_full(full, r):
+        for j in range(params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
+            full.dup(1)
+            # Ark
+            full.push(params["rks"][r][j])
+            full.mload(state[j])
+            full.addmod()
+            # Sbox
+            mulmod_chain(Stack(full, ["modulus", "x"]), chain, "x", "y")
+            full.mstore(temp[j])
+        # Mix
+        for j in range(params["size"]):
+            # Top stack = params["modulus"], avoid consuming it
+            for _ in range(2 * params["size"] - 1):
+                full.dup(1)
+            for k in range(params["size"]):
+                full.push(params["mds"][j][k])
+                full.mload(temp[k])
+                full.mulmod()
+                n_sw = 2 * params["size"] - 2 * k - 3
+                if n_sw > 0:
+                    full.swap(n_sw)
+            for _ in range(params["size"] - 1):
+                full.addmod()
+            full.mstore(state[j])
+    
+    sponge = pgr.segment("sponge")
+    sponge.push(params["modulus"])
+    sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
+    for i in range(lim_full):
+        permute_full(sponge, i)
+    for i in range(lim_full, lim_partial):
+        permute_partial(sponge, i)
+    for i in range(lim_partial, n_rounds):
+        permute_full(sponge, i)
+    
+    # sponge.pop()  # Remove modulus from stack
+    sponge.return_(state[:params["rate"]])
+    pgr.ops.extend(sponge.ops)
+    return pgr
@@ -0,0 +1,141 @@
+from .evm import Program, Hex
+from .evm.stack import Stack
+from .params import import_parameters
+from .sbox import addition_chain, mulmod_chain
+from .transform import sparse_partial_rounds
+
+
+# Values of the options of program, searched by the autotuner
+KNOBS = {"sparse": (False, True)}
+
+
+def program(params, sparse=False):
+    lim_full = (params["n_full_rounds"] // 2)
+    lim_partial = lim_full + params["n_partial_rounds"]
+    n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
+    size = params["size"]
+    chain = addition_chain(params["sbox"])
+    # State values are sums of size reduced products, plus a round constant:
+    # if that cannot overflow, additions skip the reduction (ADD, no DUP).
+    lazy = (size + 1) * int(params["modulus"]) < 2**256
+
+    pgr = Program()
+    mds = pgr.memory.alloc("mds", shape=(size, size))
+    out = pgr.memory.alloc("out", shape=(params["rate"],))
+    if sparse:
+        sp = sparse_partial_rounds(params)
+        mds0 = pgr.memory.alloc("mds0", shape=(size, size))
+
+    sponge = pgr.segment("sponge")
+    # Stack layout between rounds: modulus, then the state
+    stack = Stack(sponge)
+
+    def add(name):
+        # Top two items -> their sum, mod modulus
+        if lazy:
+            stack.op(sponge.add, 2, name)
+        else:
+            stack.dup("modulus")
+            stack.swap(2)
+            stack.op(sponge.addmod, 3, name)
+
+    def ark(j, rk, name):
+        stack.to_top(f"s{j}")
+        stack.push(rk, "rk")
+        add(name)
+
+    def sbox(name):
+        # Top item x -> x^alpha mod modulus
+        stack.rename(name, "x")
+        mulmod_chain(stack, chain, "x", name)
+
+    def mix(mds=mds):
+        for j in range(size):
+            for k in range(size):
+                stack.dup("modulus")
+                stack.op(lambda: sponge.mload(mds[j][k]), 0, "mds")
+                stack.dup(f"t{k}")
+                stack.op(sponge.mulmod, 3, f"n{j}" if k == 0 else "p")
+                if k > 0:
+                    add(f"n{j}")
+        for k in range(size):
+            stack.drop(f"t{k}")
+        for j in range(size):
+            stack.rename(f"n{j}", f"s{j}")
+
+    def mix_sparse(row, col):
+        # First row is dense
+        for k in range(size):
+            stack.dup("modulus")
+            stack.push(row[k], "row")
+            stack.dup(f"t{k}")
+            stack.op(sponge.mulmod, 3, "n0" if k == 0 else "p")
+            if k > 0:
+                add("n0")
+        # Other lanes: first column plus identity. Lanes without Sbox would
+        # grow unreduced over the partial rounds, so always reduce here.
+        for j in range(1, size):
+            stack.dup("modulus")
+            stack.dup(f"t{j}")
+            stack.dup("modulus")
+            stack.push(col[j - 1], "col")
+            stack.dup("t0")
+            stack.op(sponge.mulmod, 3, "p")
+            stack.op(sponge.addmod, 3, f"n{j}")
+        for k in range(size):
+            stack.drop(f"t{k}")
+        for j in range(size):
+            stack.rename(f"n{j}", f"s{j}")
+
+    def permute_full(r):
+        # Top-most lanes first, so that SWAPs stay shallow
+        for j in reversed(range(size)):
+            ark(j, params["rks"][r][j], f"t{j}")
+            sbox(f"t{j}")
+        mix()
+
+    def permute_partial(r):
+        rk = params["rks"][r]
+        if sparse:
+            rk = sp.rks[r - lim_full]
+        for j in reversed(range(size)):
+            ark(j, rk[j], f"t{j}")
+            if j == 0:
+                sbox(f"t{j}")
+        if not sparse:
+            mix()
+        elif r == lim_full:
+            # Only the first partial round keeps a dense matrix
+            mix(mds0)
+        else:
+            mix_sparse(sp.rows[r - lim_full], sp.cols[r - lim_full])
+
+    sponge.mstore(dest=mds, value=params["mds"])
+    if sparse:
+        sponge.mstore(dest=mds0, value=sp.first)
+    stack.push(params["modulus"], "modulus")
+    for j in range(size):
+        if j < params["rate"]:
+            # Reduce inputs so that lazy additions cannot overflow
+            stack.dup("modulus")
+            stack.push(32 * j, "offset")
+            stack.op(sponge.calldataload, 1, "x")
+            stack.op(sponge.mod, 2, f"s{j}")
+        else:
+            stack.push(Hex(0), f"s{j}")
+    for i in range(lim_full):
+        permute_full(i)
+    for i in range(lim_full, lim_partial):
+        permute_partial(i)
+    for i in range(lim_partial, n_rounds):
+        permute_full(i)
+
+    for j in range(params["rate"]):
+        stack.to_top(f"s{j}")
+        stack.dup("modulus")
+        stack.swap(1)
+        stack.op(sponge.mod, 2, f"o{j}")
+        stack.op(lambda: sponge.mstore(dest=out[j]), 1)
+    sponge.return_(out)
+    pgr.ops.extend(sponge.ops)
+    return pgr
@@ -1,52 +1,87 @@
 from .evm import Program, Hex
+from .evm.stack import Stack
 from .params import import_parameters
+from .sbox import addition_chain, mulmod_chain
+from .transform import sparse_partial_rounds
 
 
-def program(params):
-    if params["sbox"] not in [3]:
-        raise NotImplementedError(f"Sbox {params['sbox']} is not yet supported.")
-    
+# Values of the options of program, searched by the autotuner
+KNOBS = {"sparse": (False, True)}
+
+
+def program(params, sparse=False):
     lim_full = (params["n_full_rounds"] // 2)
     lim_partial = lim_full + params["n_partial_rounds"]
     n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
-    sbox_n_mods = 2 if params["sbox"] == 3 else 3
+    chain = addition_chain(params["sbox"])
     
     pgr = Program()
     state = pgr.memory.alloc("state", shape=(params["size"],))
     temp = pgr.memory.alloc("temp", shape=(params["size"],))
     mds = pgr.memory.alloc("mds", shape=(params["size"], params["size"]))
+    if sparse:
+        sp = sparse_partial_rounds(params)
+        mds0 = pgr.memory.alloc("mds0", shape=(params["size"], params["size"]))
     
-    def permute_partial(partial, r):
-        # Top stack = params["modulus"], dup to avoid reloading
-        for _ in range(1 + sbox_n_mods):
+    def mix_sparse(partial, row, col):
+        # First row is dense
+        for _ in range(2 * params["size"] - 1):
             partial.dup(1)
+        for k in range(params["size"]):
+            partial.push(row[k])
+            partial.mload(temp[k])
+            partial.mulmod()
+            n_sw = 2 * params["size"] - 2 * k - 3
+            if n_sw > 0:
+                partial.swap(n_sw)
+        for _ in range(params["size"] - 1):
+            partial.addmod()
+        partial.mstore(state[0])
+        # Other lanes: first column plus identity
+        for j in range(1, params["size"]):
+            partial.dup(1)
+            partial.dup(1)
+            partial.push(col[j - 1])
+            partial.mload(temp[0])
+            partial.mulmod()
+            partial.mload(temp[j])
+            partial.addmod()
+            partial.mstore(state[j])
+    
+    def permute_partial(partial, r):
+        rk, pmds = params["rks"][r], mds
+        if sparse:
+            # Only the first partial round keeps a dense matrix
+            rk, pmds = sp.rks[r - lim_full], mds0
+        # Top stack = params["modulus"], avoid consuming it
+        partial.dup(1)
         # Ark
-        partial.push(params["rks"][r][0])
+        partial.push(rk[0])
         partial.mload(state[0])
         partial.addmod()
         # Sbox
-        partial.swap(1)
-        partial.dup(2)
-        partial.dup(1)
-        partial.mulmod()
-        partial.mulmod()
+        mulmod_chain(Stack(partial, ["modulus", "x"]), chain, "x", "y")
         partial.mstore(temp[0])
         for j in range(1, params["size"]):
             # Top stack = params["modulus"], avoid consuming it
             partial.dup(1)
             # Ark
-            partial.push(params["rks"][r][j])
+            partial.push(rk[j])
             partial.mload(state[j])
             partial.addmod()
             # No Sbox
             partial.mstore(temp[j])
+        if sparse and r > lim_full:
+            i = r - lim_full
+            mix_sparse(partial, sp.rows[i], sp.cols[i])
+            return
         # Mix
         for j in range(params["size"]):
             # Top stack = params["modulus"], avoid consuming it
             for _ in range(2 * params["size"] - 1):
                 partial.dup(1)
             for k in range(params["size"]):
-                partial.mload(mds[j][k])
+                partial.mload(pmds[j][k])
                 partial.mload(temp[k])
                 partial.mulmod()
                 n_sw = 2 * params["size"] - 2 * k - 3
@@ -59,18 +94,13 @@ def program(params):
     def permute_full(full, r):
         for j in range(params["size"]):
             # Top stack = params["modulus"], avoid consuming it
-            for _ in range(1 + sbox_n_mods):
-                full.dup(1)
+            full.dup(1)
             # Ark
             full.push(params["rks"][r][j])
             full.mload(state[j])
             full.addmod()
             # Sbox
-            full.swap(1)
-            full.dup(2)
-            full.dup(1)
-            full.mulmod()
-            full.mulmod()
+            mulmod_chain(Stack(full, ["modulus", "x"]), chain, "x", "y")
             full.mstore(temp[j])
         # Mix
         for j in range(params["size"]):
@@ -92,6 +122,8 @@ def program(params):
     sponge.push(params["modulus"])
     sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
     sponge.mstore(dest=mds, value=params["mds"])
+    if sparse:
+        sponge.mstore(dest=mds0, value=sp.first)
     for i in range(lim_full):
         permute_full(sponge, i)
     for i in range(lim_full, lim_partial):
@@ -1,115 +1,354 @@
 import json
 
-from .evm import Program, Hex
+from .evm import LivenessAllocator, Program, Hex, Label
 from .params import import_parameters
+from .sbox import addition_chain, mulmont_chain, n_scratch
+from .layout import (length_tag, load_batch_input, load_block_word,
+                     next_block, pad_message, require_blocks,
+                     round_groups, store_batch_output)
+from .transform import absorb_constants, sparse_partial_rounds
 
 
-def program(params):
-    if params["sbox"] not in [3]:
-        raise NotImplementedError(f"Sbox {params['sbox']} is not yet supported.")
-    
+# Values of the options of program, searched by the autotuner. sparse
+# always costs more here, see the README
+KNOBS = {
+    "absorb": (False, True),
+    "rounds_per_call": (1, 2, 4, 8, 16),
+}
+
+
+def program(params, sparse=False, absorb=True, rounds_per_call=1,
+            batch=False, variable_length=False, merkle=False):
+    """`rounds_per_call` consecutive rounds of a kind run in one call,
+    their constants being stored in a table beforehand. Table entries
+    are EVMMAX slots, whose number limits it.
+
+    With `batch`, calldata holds one or more rate-word inputs, hashed in a
+    loop after a single setup, and the outputs are returned in order.
+    Other calldata sizes revert.
+    With `variable_length`, calldata is a message of any number of words,
+    padded and absorbed rate words per permutation, and the rate words of
+    the final state are returned. A partial last word reverts.
+    With `merkle`, calldata holds rate^d leaves, d >= 1, and the root of
+    their rate-ary tree is returned, each node being the first lane of
+    the permutation of its children. Nodes stay in Montgomery form. Other
+    leaf counts revert.
+    """
     lim_full = (params["n_full_rounds"] // 2)
     lim_partial = lim_full + params["n_partial_rounds"]
     n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
-    sbox_n_mods = 2 if params["sbox"] == 3 else 3
+    chain = addition_chain(params["sbox"])
+    # Constants of lanes without Sbox move to the next round, which must exist
+    absorb = absorb and lim_partial < n_rounds
+    if batch + variable_length + merkle > 1:
+        raise ValueError("Batch, variable-length and Merkle modes are "
+                         "exclusive")
+    if variable_length and params["rate"] >= params["size"]:
+        raise ValueError("Variable-length mode needs a capacity lane")
+    if merkle and params["rate"] < 2:
+        raise ValueError("Merkle mode needs a rate of at least 2")
+    if rounds_per_call < 1:
+        raise ValueError(f"Rounds per call must be positive: "
+                         f"passed {rounds_per_call}")
+
+    # Calls as (body, entry round in the body, rounds)
+    runs = [("full", 0, lim_full)]
+    if sparse:
+        # Only the first partial round keeps a dense matrix
+        runs += [("partial", lim_full, lim_full + 1),
+                 ("sparse", lim_full + 1, lim_partial)]
+    else:
+        runs += [("partial", lim_full, lim_partial)]
+    runs += [("full", lim_partial, n_rounds)]
+    n_body = {}
+    for kind, start, stop in runs:
+        n_body[kind] = max(n_body.get(kind, 1),
+                           min(rounds_per_call, stop - start))
+    calls = [(kind, entry, rounds) for kind, start, stop in runs
+             for entry, rounds in round_groups(start, stop, n_body[kind])]
+    n_table = max(n_body.values())
     
-    pgr = Program()
-    mod = pgr.memory.alloc("modulus")
-    montR2 = pgr.memory.alloc("montR2")
+    # Lifetimes are in calls, the setup being call -1 and the output call
+    # n_calls. A loop reruns the calls (and the output in batch mode):
+    # values stored in the setup and read in the loop stay live throughout,
+    # the others share words within an iteration
+    pgr = Program(LivenessAllocator())
+    looped = batch or variable_length or merkle
+    kinds = [kind for kind, _, _ in calls]
+    i_partial = kinds.index("partial")
+    i_last_partial = kinds.index("full", i_partial) - 1
+    n_calls = len(calls)
+
+    def live(first, last):
+        if looped and first < 0 <= last:
+            return (-1, n_calls)
+        return (first, last)
+
+    labels = {(kind, entry): Label(f"{kind}.{entry}")
+              for kind, entry, _ in calls}
+    for kind in ("partial", "full", "sparse"):
+        labels.setdefault((kind, 0), Label(f"{kind}.0"))
+    labels["sponge"] = Label("sponge")
+    labels["loop"] = Label("loop")
+    labels["leaf"] = Label("leaf")
+    labels["level"] = Label("level")
+    labels["valid"] = Label("valid")
+    mod = pgr.memory.alloc("modulus", live=live(-1, -1))  # read by setmodx
+    # Inputs of the loop are converted at the start of the iteration
+    montR2 = pgr.memory.alloc("montR2",
+                              live=live(-1, 0 if batch or variable_length
+                                        else -1))
     state = pgr.memory.alloc("state", shape=(params["size"],))
     temp = pgr.memory.alloc("temp", shape=(params["size"],))
     mds = pgr.memory.alloc("mds", shape=(params["size"], params["size"]))
-    rk = pgr.memory.alloc("rk", shape=(params["size"],))
-    fp = pgr.memory.alloc("fp")  # need only one return point
-    
-    partial = pgr.segment("permute_partial")
-    partial.jumpdest()
-    # Ark
-    partial.addmodx(state[0], state[0], rk[0]) 
-    # Sbox
-    # Reuse rk as accumulator
-    partial.mulmontx(rk[0], state[0], state[0])
-    partial.mulmontx(temp[0], rk[0], state[0])
-    for j in range(1, params["size"]):
-        # Ark and No Sbox
-        partial.addmodx(temp[j], state[j], rk[j])
-    # Mix
-    for j in range(params["size"]):
-        partial.mulmontx(state[j], temp[0], mds[j][0])
-        for k in range(1, params["size"]):
-            # Reuse rk as accumulator
-            partial.mulmontx(rk[k], temp[k], mds[j][k])
-            partial.addmodx(state[j], state[j], rk[k])
-    partial.jump(fp)
+    rk = pgr.memory.alloc("rk", shape=(n_table, params["size"]),
+                          live=live(0, n_calls - 1))
+    if n_scratch(chain) > 1:
+        sbox = pgr.memory.alloc("sbox", shape=(n_scratch(chain) - 1,),
+                                live=live(0, n_calls - 1))
+    # need only one return point
+    fp = pgr.memory.alloc("fp", slot=False)
+    if sparse:
+        sp = sparse_partial_rounds(params, montgomery=True)
+        mds0 = pgr.memory.alloc("mds0", shape=(params["size"], params["size"]),
+                                live=live(-1, i_partial))
+        # Sparse calls reuse the words of mds0
+        sparse_calls = live(i_partial + 1, i_partial + kinds.count("sparse"))
+        row = pgr.memory.alloc("row", shape=(n_body["sparse"], params["size"]),
+                               live=sparse_calls)
+        col = pgr.memory.alloc("col", shape=(n_body["sparse"],
+                                             params["size"] - 1),
+                               live=sparse_calls)
+    rks = params["rks"]
+    if sparse:
+        rks = rks[:lim_full] + sp.rks + rks[lim_partial:]
+    # Partial rounds reuse rk as accumulator, unless its zeros must be kept
+    acc = None
+    if absorb:
+        rks = absorb_constants(params, montgomery=True,
+                               sparse=sp if sparse else None)
+        acc = pgr.memory.alloc("acc", shape=(params["size"],),
+                               live=live(i_partial, i_last_partial))
+    # Output frommontx; batch mode stores it once
+    one = pgr.memory.alloc("one", live=live(-1 if batch else n_calls, n_calls))
+    if batch:
+        # calldata offset of the input
+        ctr = pgr.memory.alloc("ctr", slot=False)
+    if variable_length:
+        ctr = pgr.memory.alloc("ctr", slot=False)  # offset of the block in msg
+        # offset past the padded message
+        end = pgr.memory.alloc("end", slot=False)
+    if merkle:
+        # offsets of the children and of the parent in nodes
+        ctr = pgr.memory.alloc("ctr", slot=False)
+        wr = pgr.memory.alloc("wr", slot=False)
+        end = pgr.memory.alloc("end", slot=False)  # offset past the level
+    try:
+        pgr.memory.pack()
+    except ValueError as e:
+        # The table of rounds_per_call rounds is what grows
+        raise ValueError(f"rounds_per_call={rounds_per_call} does not fit "
+                         f"in EVMMAX slots with these options: {e}") from e
+    scratch = list(sbox) if n_scratch(chain) > 1 else []
+    # Buffers growing with the calldata, past all variables
+    if batch:
+        out = pgr.memory.alloc("out")
+    if variable_length:
+        msg = pgr.memory.alloc("msg")
+    if merkle:
+        nodes = pgr.memory.alloc("nodes")
     
-    full = pgr.segment("permute_full")
-    full.jumpdest()
-    for j in range(params["size"]):
+    def ark_sbox_partial(partial, rk, lanes=True):
         # Ark
-        full.addmodx(state[j], state[j], rk[j]) 
+        partial.addmodx(state[0], state[0], rk[0]) 
         # Sbox
         # Reuse rk as accumulator
-        full.mulmontx(rk[j], state[j], state[j])
-        full.mulmontx(temp[j], rk[j], state[j])
-    # Mix
-    for j in range(params["size"]):
-        full.mulmontx(state[j], temp[0], mds[j][0])
-        for k in range(1, params["size"]):
+        mulmont_chain(partial, chain, state[0], temp[0], [rk[0]] + scratch)
+        if not lanes:
+            return
+        for j in range(1, params["size"]):
+            # Ark (a copy when constants are absorbed) and No Sbox
+            partial.addmodx(temp[j], state[j], rk[j])
+
+    def permute_partial(partial, i):
+        ark_sbox_partial(partial, rk[i])
+        # Mix
+        pmds = mds0 if sparse else mds
+        pacc = acc or rk[i]
+        for j in range(params["size"]):
+            partial.mulmontx(state[j], temp[0], pmds[j][0])
+            for k in range(1, params["size"]):
+                partial.mulmontx(pacc[k], temp[k], pmds[j][k])
+                partial.addmodx(state[j], state[j], pacc[k])
+
+    def permute_full(full, i):
+        for j in range(params["size"]):
+            # Ark
+            full.addmodx(state[j], state[j], rk[i][j]) 
+            # Sbox
             # Reuse rk as accumulator
-            full.mulmontx(rk[k], temp[k], mds[j][k])
-            full.addmodx(state[j], state[j], rk[k])
-    full.jump(fp)
-    
-    # Static analysis for jumpdests
-    sponge_jumpdest = 2 + len(full) + len(partial)
-    sponge_jumpdest_size = Hex(sponge_jumpdest).nbytes()
-    sponge_jumpdest = Hex(sponge_jumpdest + sponge_jumpdest_size)
-    if sponge_jumpdest.nbytes() > sponge_jumpdest_size:
-        sponge_jumpdest = Hex(sponge_jumpdest + 1)
+            mulmont_chain(full, chain, state[j], temp[j],
+                          [rk[i][j]] + scratch)
+        # Mix
+        for j in range(params["size"]):
+            full.mulmontx(state[j], temp[0], mds[j][0])
+            for k in range(1, params["size"]):
+                # Reuse rk as accumulator
+                full.mulmontx(rk[i][k], temp[k], mds[j][k])
+                full.addmodx(state[j], state[j], rk[i][k])
+
+    def permute_sparse(spr, i):
+        # First row, first column and identity elsewhere. Absorbed
+        # constants leave lanes 1.. unchanged by the ark, so they are
+        # updated in place instead of copied
+        ark_sbox_partial(spr, rk[i], not absorb)
+        lanes = state if absorb else temp
+        pacc = acc or rk[i]
+        spr.mulmontx(state[0], temp[0], row[i][0])
+        for k in range(1, params["size"]):
+            spr.mulmontx(pacc[k], lanes[k], row[i][k])
+            spr.addmodx(state[0], state[0], pacc[k])
+        for j in range(1, params["size"]):
+            if absorb:
+                spr.mulmontx(temp[j], temp[0], col[i][j - 1])
+            else:
+                spr.mulmontx(state[j], temp[0], col[i][j - 1])
+            spr.addmodx(state[j], state[j], temp[j])
+
+    def body(kind, permute):
+        seg = pgr.segment(f"permute_{kind}")
+        for i in range(n_body.get(kind, 1)):
+            if (kind, i) in labels:
+                seg.jumpdest(labels[kind, i])
+            permute(seg, i)
+        seg.jump(fp)
+        return seg
+
+    partial = body("partial", permute_partial)
+    full = body("full", permute_full)
+    if sparse:
+        spr = body("sparse", permute_sparse)
     
     main = pgr.segment("main")
-    main.jump(sponge_jumpdest)
-    
-    jumpdests = {
-        "partial": Hex(len(main)),
-        "full": Hex(len(main) + len(partial)),
-        "sponge": sponge_jumpdest,
-    }
-    
-    sponge = pgr.segment("sponge")
+    main.jump(labels["sponge"])
 
-    # We know all code offsets for jumps.
-    partial.offset = Hex(len(main))
-    full.offset = Hex(len(main) + len(partial))
-    sponge.offset = sponge_jumpdest
-    
-    sponge.jumpdest()
+    sponge = pgr.segment("sponge")
+    sponge.jumpdest(labels["sponge"])
     sponge.mstore(dest=mod, value=params["modulus"])
     sponge.mstore(dest=montR2, value=params["montR2"])
     sponge.setmodx(modulus=mod)
-    sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
+    if variable_length:
+        pad_message(sponge, msg, end, labels["valid"])
+        # State kept in Montgomery form across blocks
+        tag = (length_tag(params["rate"]) * int(params["montR"])
+               % int(params["modulus"]))
+        sponge.mstore(state[params["rate"]], tag)
+    elif merkle:
+        sponge.calldatasize()
+        sponge.dup(1)
+        sponge.mstore(end)
+        sponge.push(0)
+        sponge.push(nodes.addr)
+        sponge.calldatacopy()
+    elif not batch:
+        sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
     sponge.mstore(dest=mds, value=params["mds"])
-    # Input tomontx
-    for j in range(params["rate"]):
-        sponge.mulmontx(state[j], state[j], montR2)
-    for i in range(lim_full):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["full"])
-    for i in range(lim_full, lim_partial):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["partial"])
-    for i in range(lim_partial, n_rounds):
-        sponge.mstore(rk, params["rks"][i])
-        sponge.call(fp, jumpdests["full"])
+    if sparse:
+        sponge.mstore(dest=mds0, value=sp.first)
+    if batch:
+        sponge.calldatasize()
+        require_blocks(sponge, params["rate"], labels["valid"])
+        sponge.mstore(dest=one, value=Hex(1))
+        sponge.jumpdest(labels["loop"])
+        load_batch_input(sponge, state, params["rate"], ctr)
+    if variable_length:
+        sponge.jumpdest(labels["loop"])
+        for j in range(params["rate"]):
+            load_block_word(sponge, msg, ctr, j)
+            sponge.mstore(temp[j])
+            sponge.mulmontx(temp[j], temp[j], montR2)
+            sponge.addmodx(state[j], state[j], temp[j])
+    elif merkle:
+        # Leaves tomontx, in place
+        sponge.jumpdest(labels["leaf"])
+        load_block_word(sponge, nodes, ctr, 0)
+        sponge.mstore(temp[0])
+        sponge.mulmontx(temp[0], temp[0], montR2)
+        sponge.mload(temp[0])
+        sponge.mload(ctr)
+        sponge.add(nodes.addr)
+        sponge.mstore()
+        next_block(sponge, 1, ctr, end, labels["leaf"])
+        # Parents overwrite the level as its children are read
+        sponge.jumpdest(labels["level"])
+        # Levels of rate^d leaves are of a multiple of rate nodes
+        sponge.mload(end)
+        require_blocks(sponge, params["rate"], labels["valid"])
+        sponge.mstore(ctr, 0)
+        sponge.mstore(wr, 0)
+        sponge.jumpdest(labels["loop"])
+        for j in range(params["rate"]):
+            load_block_word(sponge, nodes, ctr, j)
+            sponge.mstore(state[j])
+        for j in range(params["rate"], params["size"]):
+            sponge.mstore(state[j], 0)
+    else:
+        # Input tomontx
+        for j in range(params["rate"]):
+            sponge.mulmontx(state[j], state[j], montR2)
+    # Table rows whose other lanes hold the zeros of absorbed constants
+    zeros = set()
+    for kind, entry, rounds in calls:
+        for i, r in enumerate(rounds, entry):
+            if absorb and kind != "full" and i in zeros:
+                sponge.mstore(rk[i][0], rks[r][0])
+            else:
+                sponge.mstore(rk[i], rks[r])
+            # Full rounds use rk as accumulator
+            if kind == "full":
+                zeros.discard(i)
+            else:
+                zeros.add(i)
+            if kind == "sparse":
+                sponge.mstore(row[i], sp.rows[r - lim_full])
+                sponge.mstore(col[i], sp.cols[r - lim_full])
+        sponge.call(fp, labels[kind, entry])
     
+    if variable_length:
+        next_block(sponge, params["rate"], ctr, end, labels["loop"])
+    if merkle:
+        sponge.mload(state[0])
+        sponge.mload(wr)
+        sponge.add(nodes.addr)
+        sponge.mstore()
+        sponge.mload(wr)
+        sponge.add(32)
+        sponge.mstore(wr)
+        next_block(sponge, params["rate"], ctr, end, labels["loop"])
+        # Next level, down to the root
+        sponge.mload(wr)
+        sponge.dup(1)
+        sponge.mstore(end)
+        sponge.push(32)
+        sponge.lt()
+        sponge.jumpi(labels["level"])
     # Output frommontx
-    sponge.mstore(dest=montR2, value=Hex(1))
-    for j in range(params["rate"]):
-        sponge.mulmontx(state[j], state[j], montR2)
-    sponge.return_(state[:params["rate"]])
+    if batch:
+        for j in range(params["rate"]):
+            sponge.mulmontx(state[j], state[j], one)
+        store_batch_output(sponge, state, params["rate"], ctr, out,
+                           labels["loop"])
+    else:
+        n_out = 1 if merkle else params["rate"]
+        sponge.mstore(dest=one, value=Hex(1))
+        for j in range(n_out):
+            sponge.mulmontx(state[j], state[j], one)
+        sponge.return_(state[:n_out])
 
     pgr.ops.extend(main.ops)
     pgr.ops.extend(partial.ops)
     pgr.ops.extend(full.ops)
+    if sparse:
+        pgr.ops.extend(spr.ops)
     pgr.ops.extend(sponge.ops)
     return pgr
@@ -1,40 +1,71 @@
-from .evm import Program, Hex
+from .evm import LivenessAllocator, Program, Hex
 from .params import import_parameters
+from .sbox import addition_chain, mulmont_chain, n_scratch
+from .transform import sparse_partial_rounds
 
 
-def program(params):
-    if params["sbox"] not in [3]:
-        raise NotImplementedError(f"Sbox {params['sbox']} is not yet supported.")
-    
+# Values of the options of program, searched by the autotuner. sparse
+# always costs more here, see the README
+KNOBS = {}
+
+
+def program(params, sparse=False):
     lim_full = (params["n_full_rounds"] // 2)
     lim_partial = lim_full + params["n_partial_rounds"]
     n_rounds = params["n_full_rounds"] + params["n_partial_rounds"]
-    sbox_n_mods = 2 if params["sbox"] == 3 else 3
+    chain = addition_chain(params["sbox"])
     
-    pgr = Program()
+    # Lifetimes are in rounds, the setup being round -1
+    pgr = Program(LivenessAllocator())
     mod = pgr.memory.alloc("modulus")
     montR2 = pgr.memory.alloc("montR2")
     state = pgr.memory.alloc("state", shape=(params["size"],))
     temp = pgr.memory.alloc("temp", shape=(params["size"],))
     mds = pgr.memory.alloc("mds", shape=(params["size"], params["size"]))
     rk = pgr.memory.alloc("rk", shape=(params["size"],))
+    if n_scratch(chain) > 1:
+        sbox = pgr.memory.alloc("sbox", shape=(n_scratch(chain) - 1,))
+    if sparse:
+        sp = sparse_partial_rounds(params, montgomery=True)
+        mds0 = pgr.memory.alloc("mds0", shape=(params["size"], params["size"]),
+                                live=(-1, lim_full))
+        # Sparse rounds reuse the words of mds0
+        row = pgr.memory.alloc("row", shape=(params["size"],),
+                               live=(lim_full + 1, lim_partial - 1))
+        col = pgr.memory.alloc("col", shape=(params["size"] - 1,),
+                               live=(lim_full + 1, lim_partial - 1))
+    pgr.memory.pack()
+    scratch = list(sbox) if n_scratch(chain) > 1 else []
     
-    def permute_partial(partial):
+    def mix_sparse(partial):
+        # First row is dense
+        partial.mulmontx(state[0], temp[0], row[0])
+        for k in range(1, params["size"]):
+            partial.mulmontx(rk[k], temp[k], row[k])
+            partial.addmodx(state[0], state[0], rk[k])
+        # Other lanes: first column plus identity
+        for j in range(1, params["size"]):
+            partial.mulmontx(state[j], temp[0], col[j - 1])
+            partial.addmodx(state[j], state[j], temp[j])
+    
+    def permute_partial(partial, pmds=mds):
         # Ark
         partial.addmodx(state[0], state[0], rk[0]) 
         # Sbox
         # Reuse rk as accumulator
-        partial.mulmontx(rk[0], state[0], state[0])
-        partial.mulmontx(temp[0], rk[0], state[0])
+        mulmont_chain(partial, chain, state[0], temp[0], [rk[0]] + scratch)
         for j in range(1, params["size"]):
             # Ark and No Sbox
             partial.addmodx(temp[j], state[j], rk[j])
+        if pmds is None:
+            mix_sparse(partial)
+            return
         # Mix
         for j in range(params["size"]):
-            partial.mulmontx(state[j], temp[0], mds[j][0])
+            partial.mulmontx(state[j], temp[0], pmds[j][0])
             for k in range(1, params["size"]):
                 # Reuse rk as accumulator
-                partial.mulmontx(rk[k], temp[k], mds[j][k])
+                partial.mulmontx(rk[k], temp[k], pmds[j][k])
                 partial.addmodx(state[j], state[j], rk[k])
     
     def permute_full(full):
@@ -43,8 +74,7 @@ def program(params):
             full.addmodx(state[j], state[j], rk[j]) 
             # Sbox
             # Reuse rk as accumulator
-            full.mulmontx(rk[j], state[j], state[j])
-            full.mulmontx(temp[j], rk[j], state[j])
+            mulmont_chain(full, chain, state[j], temp[j], [rk[j]] + scratch)
         # Mix
         for j in range(params["size"]):
             full.mulmontx(state[j], temp[0], mds[j][0])
@@ -59,6 +89,8 @@ def program(params):
     sponge.setmodx(modulus=mod)
     sponge.calldatacopy(dest=state[:params["rate"]], offset=0)
     sponge.mstore(dest=mds, value=params["mds"])
+    if sparse:
+        sponge.mstore(dest=mds0, value=sp.first)
     # Input tomontx
     for j in range(params["rate"]):
         sponge.mulmontx(state[j], state[j], montR2)
@@ -67,8 +99,19 @@ def program(params):
         sponge.mstore(rk, params["rks"][i])
         permute_full(sponge)
     for i in range(lim_full, lim_partial):
-        sponge.mstore(rk, params["rks"][i])
-        permute_partial(sponge)
+        if not sparse:
+            sponge.mstore(rk, params["rks"][i])
+            permute_partial(sponge)
+            continue
+        # Only the first partial round keeps a dense matrix
+        r = i - lim_full
+        sponge.mstore(rk, sp.rks[r])
+        if r == 0:
+            permute_partial(sponge, mds0)
+        else:
+            sponge.mstore(row, sp.rows[r])
+            sponge.mstore(col, sp.cols[r])
+            permute_partial(sponge, None)
     for i in range(lim_partial, n_rounds):
         sponge.mstore(rk, params["rks"][i])
         permute_full(sponge)
@@ -0,0 +1,128 @@
+from collections.abc import Iterable, Iterator, Sequence
+
+from .layout import length_tag
+
+
+class Poseidon:
+    """Reference Poseidon permutation on plain ints
+
+    Round constants and MDS rows are precomputed at load time in canonical
+    and in Montgomery form. `montgomery` tells in which form the parameter
+    file stores them: sw2mont.json is in Montgomery form, as consumed by the
+    EVMMAX generators, while the std generators use the values as is, which
+    `montgomery=False` reproduces.
+    """
+    def __init__(self, params, montgomery: bool = True):
+        self.modulus = p = int(params["modulus"])
+        self.montR = int(params["montR"])
+        self.montR2 = int(params["montR2"])
+        self.montRinv = int(params["montRinv"])
+        self.rate = params["rate"]
+        self.size = params["size"]
+        self.alpha = params["sbox"]
+
+        rks = [[int(x) for x in row] for row in params["rks"]]
+        mds = [[int(x) for x in row] for row in params["mds"]]
+        if montgomery:
+            self.rks_mont, self.mds_mont = rks, mds
+            self.rks = [[x * self.montRinv % p for x in row] for row in rks]
+            self.mds = [[x * self.montRinv % p for x in row] for row in mds]
+        else:
+            self.rks, self.mds = rks, mds
+            self.rks_mont = [[x * self.montR % p for x in row] for row in rks]
+            self.mds_mont = [[x * self.montR % p for x in row] for row in mds]
+
+        # Round schedule: first full, partial, last full
+        lim_full = params["n_full_rounds"] // 2
+        lim_partial = lim_full + params["n_partial_rounds"]
+        self.schedule = (
+            (True, 0, lim_full),
+            (False, lim_full, lim_partial),
+            (True, lim_partial, len(rks)),
+        )
+        self._temp = [0] * self.size
+
+    def to_mont(self, x: int) -> int:
+        return x * self.montR % self.modulus
+
+    def from_mont(self, x: int) -> int:
+        return x * self.montRinv % self.modulus
+
+    def _rounds(self, state, rks, mds, scale):
+        # Products are x * y * scale: scale is 1 in canonical form and
+        # R^-1 in Montgomery form.
+        p, alpha, size = self.modulus, self.alpha, self.size
+        sbox_scale = pow(scale, alpha - 1, p)
+        t = self._temp
+        for full, start, stop in self.schedule:
+            n_sbox = size if full else 1
+            for r in range(start, stop):
+                rk = rks[r]
+                # Ark and Sbox
+                for j in range(n_sbox):
+                    t[j] = pow(state[j] + rk[j], alpha, p) * sbox_scale % p
+                for j in range(n_sbox, size):
+                    t[j] = state[j] + rk[j]
+                # Mix
+                for j in range(size):
+                    row = mds[j]
+                    acc = 0
+                    for k in range(size):
+                        acc += row[k] * t[k]
+                    state[j] = acc * scale % p
+        return state
+
+    def permute(self, state: list) -> list:
+        """Permute state in place, canonical form"""
+        return self._rounds(state, self.rks, self.mds, 1)
+
+    def permute_mont(self, state: list) -> list:
+        """Permute state in place, Montgomery form (as EVMMAX does)"""
+        return self._rounds(state, self.rks_mont, self.mds_mont,
+                            self.montRinv)
+
+    def hash(self, inputs: Sequence[int]) -> list:
+        if len(inputs) != self.rate:
+            raise ValueError(f"Expected {self.rate} inputs, "
+                             f"passed {len(inputs)}")
+        state = [x % self.modulus for x in inputs]
+        state.extend([0] * (self.size - self.rate))
+        return self.permute(state)[:self.rate]
+
+    def hash_message(self, message: Sequence[int]) -> list:
+        """Variable-length hash: 10* padding, length tag in the capacity"""
+        if self.rate >= self.size:
+            raise ValueError("Variable-length hashing needs a capacity lane")
+        padded = [x % self.modulus for x in message] + [1]
+        padded += [0] * (-len(padded) % self.rate)
+        state = [0] * self.size
+        state[self.rate] = length_tag(self.rate)
+        for i in range(0, len(padded), self.rate):
+            for j in range(self.rate):
+                state[j] = (state[j] + padded[i + j]) % self.modulus
+            self.permute(state)
+        return state[:self.rate]
+
+    def merkle_root(self, leaves: Sequence[int]) -> int:
+        """Root of the rate-ary tree of rate^d leaves, each node being the
+        first lane of the permutation of its children"""
+        if self.rate < 2:
+            raise ValueError("Merkle trees need a rate of at least 2")
+        n = len(leaves)
+        while n > 1 and n % self.rate == 0:
+            n //= self.rate
+        if n != 1 or len(leaves) < self.rate:
+            raise ValueError(f"{len(leaves)} leaves is not a power of rate "
+                             f"{self.rate}")
+        level = [x % self.modulus for x in leaves]
+        while len(level) > 1:
+            level = [self.hash(level[i:i + self.rate])[0]
+                     for i in range(0, len(level), self.rate)]
+        return level[0]
+
+    def hash_many(self, inputs: Iterable[Sequence[int]]) -> list:
+        return [self.hash(x) for x in inputs]
+
+    def hash_stream(self, inputs: Iterable[Sequence[int]]) -> Iterator[list]:
+        for x in inputs:
+            yield self.hash(x)
@@ -0,0 +1,164 @@
+from .evm.stack import Stack
+
+
+# Exponents above it use the sliding-window method instead of an exhaustive
+# search. The search is over star chains, which are shortest below 12509.
+SEARCH_LIMIT = 1 << 7
+
+
+def _steps(chain):
+    """Chain values -> (i, j) such that chain[k] = chain[i] + chain[j]"""
+    steps = []
+    for k in range(1, len(chain)):
+        steps.append(next(
+            (i, j) for j in reversed(range(k)) for i in range(j + 1)
+            if chain[i] + chain[j] == chain[k]))
+    return steps
+
+
+def _last_uses(steps):
+    last = {}
+    for k, (i, j) in enumerate(steps, 1):
+        last[i] = last[j] = k
+    return last
+
+
+def n_scratch(steps) -> int:
+    """Scratch slots to compute the chain in memory, the input slot being
+    free after its last use and the result going to its own slot"""
+    last = _last_uses(steps)
+    free, n = [], 0
+    for k, (i, j) in enumerate(steps, 1):
+        free.extend(v for v in {i, j} if last[v] == k)
+        if k == len(steps):
+            break
+        if free:
+            free.pop()
+        else:
+            n += 1
+    return n
+
+
+def _window_chain(n, k):
+    """Sliding-window chain of windows of up to k bits, the binary method
+    for k = 1: odd values up to the largest window, then doublings each
+    followed by the addition of a window"""
+    bits = bin(n)[2:]
+    windows = []  # (shift, value)
+    i = 0
+    while i < len(bits):
+        if bits[i] == "0":
+            windows.append((1, 0))
+            i += 1
+            continue
+        j = min(i + k, len(bits))
+        while bits[j - 1] == "0":
+            j -= 1
+        windows.append((j - i, int(bits[i:j], 2)))
+        i = j
+    top = max(w for _, w in windows)
+    values = {1, 2} | set(range(3, top + 1, 2)) if top > 1 else {1}
+    acc = windows[0][1]
+    for shift, w in windows[1:]:
+        for _ in range(shift):
+            acc *= 2
+            values.add(acc)
+        if w:
+            acc += w
+            values.add(acc)
+    return sorted(values)
+
+
+def addition_chain(n):
+    """Shortest addition chain for n, with the fewest scratch slots
+
+    Returns the chain steps: step k computes value k + 1, chain[0] being 1,
+    as the sum of values i and j. Exponents above SEARCH_LIMIT take the
+    shortest sliding-window chain for windows of 1 to 5 bits, which is
+    not always shortest: 255 takes 11 steps against 10.
+    """
+    if n < 2:
+        raise ValueError(f"Exponent must be at least 2: passed {n}")
+    if n > SEARCH_LIMIT:
+        chains = (_steps(_window_chain(n, k)) for k in range(1, 6))
+        return min(chains, key=lambda steps: (len(steps), n_scratch(steps)))
+
+    best = []
+
+    def search(chain, length):
+        if chain[-1] == n:
+            steps = _steps(chain)
+            if not best or n_scratch(steps) < n_scratch(best[0]):
+                best[:] = [steps]
+            # A single scratch slot is the minimum for more than one step
+            return n_scratch(best[0]) <= min(1, length - 1)
+        if len(chain) > length or chain[-1] << (length + 1 - len(chain)) < n:
+            return False
+        sums = sorted({chain[-1] + a for a in chain
+                       if chain[-1] + a <= n}, reverse=True)
+        return any(search(chain + [s], length) for s in sums)
+
+    length = n.bit_length() - 1
+    while not best:
+        search([1], length)
+        length += 1
+    return best[0]
+
+
+def mulmod_chain(stack: Stack, steps, x, name, modulus="modulus"):
+    """Emit MULMODs raising stack item x to the power of the chain
+
+    x is consumed and the result pushed as `name`. Operands at their last
+    use are moved under a copy of the modulus rather than duplicated.
+    """
+    names = [x] + [f"{x}^{k}" for k in range(1, len(steps))] + [name]
+    last = _last_uses(steps)
+    for k, (i, j) in enumerate(steps, 1):
+        a, b = names[i], names[j]
+        stack.dup(modulus)
+        below = stack.items[-3:-1]
+        if i == j:
+            if last[i] == k and below[-1] == a:
+                stack.swap(1)
+            else:
+                stack.dup(a)
+            stack.dup(a)
+        elif last[i] == last[j] == k and sorted(below) == sorted([a, b]):
+            stack.swap(2)
+        elif last[i] == k and below[-1] == a:
+            stack.swap(1)
+            stack.dup(b)
+        elif last[j] == k and below[-1] == b:
+            stack.swap(1)
+            stack.dup(a)
+        else:
+            stack.dup(a)
+            stack.dup(b)
+        stack.op(stack.segment.mulmod, 3, names[k])
+        # Drop operands duplicated at their last use
+        for v in {i, j}:
+            if last[v] == k and names[v] in stack.items:
+                stack.drop(names[v])
+
+
+def mulmont_chain(segment, steps, x, out, scratch):
+    """Emit MULMONTXs raising slot x to the power of the chain into out
+
+    x is overwritten once no longer needed. `scratch` lists the free
+    slots, at least n_scratch(steps) of them.
+    """
+    last = _last_uses(steps)
+    slots = [x]
+    free = list(reversed(scratch))
+    for k, (i, j) in enumerate(steps, 1):
+        free.extend(slots[v] for v in dict.fromkeys((i, j)) if last[v] == k)
+        if k == len(steps):
+            dest = out
+        elif free:
+            # Latest freed first: an operand slot can be written in place
+            dest = free.pop()
+        else:
+            raise ValueError(f"Chain needs {n_scratch(steps)} scratch slots, "
+                             f"passed {len(scratch)}")
+        segment.mulmontx(dest, slots[i], slots[j])
+        slots.append(dest)
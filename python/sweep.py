@@ -0,0 +1,178 @@
+"""Sweep over parameter sets, variants, generator options and optimizer
+rules, on a process pool
+
+Results are appended to a JSONL file as they complete, one line per
+combination. Combinations already in the file are skipped, so that an
+interrupted sweep resumes where it stopped.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import json
+import os
+from pathlib import Path
+import sys
+
+from . import paramgen
+from .benchmark import accepts, calldata, fmt, variants
+from .cache import BuildCache, build
+from .evm import Interpreter, MAX_CODE_SIZE
+from .evm.optimizer import rules as all_rules
+from .params import load_parameters
+
+
+def combinations(param_files, names, options=(), rules=((),)):
+    """Jobs of the cross-product; each of `options` is tried off and on,
+    for the generators that accept it"""
+    jobs = []
+    for path, name, rule in itertools.product(param_files, names, rules):
+        generator = variants.get(name)
+        if generator is None:
+            raise ValueError(f"No generator for variant {name}")
+        accepted = [o for o in options if accepts(generator, o)]
+        for values in itertools.product((False, True), repeat=len(accepted)):
+            jobs.append({
+                "params": str(path),
+                "implementation": name,
+                "options": dict(zip(accepted, values)),
+                "rules": list(rule),
+            })
+    return jobs
+
+
+def job_id(job) -> str:
+    return json.dumps([job["params"], job["implementation"],
+                       job["options"], job["rules"]], sort_keys=True)
+
+
+def measure(job, cache_dir=None):
+    """Result of a job; errors of the generator are recorded, not raised"""
+    params = load_parameters(job["params"])
+    result = dict(job, size=params["size"], rate=params["rate"],
+                  sbox=params["sbox"],
+                  rounds=[params["n_full_rounds"],
+                          params["n_partial_rounds"]])
+    cache = BuildCache(cache_dir) if cache_dir else None
+    try:
+        b = build(variants[job["implementation"]], params, job["rules"],
+                  cache, **job["options"])
+    except ValueError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    r = Interpreter(b.code).run(calldata(params))
+    result.update(
+        code_size=b.code_size,
+        deployable=b.code_size <= MAX_CODE_SIZE,
+        gas=r.gas,
+        n_ops=r.n_ops,
+        static_gas=b.gas and b.gas["total"],
+        output=r.output.hex(),
+    )
+    return result
+
+
+def load(path):
+    """Results of a JSONL file, ignoring a truncated last line"""
+    results = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return results
+
+
+def run(jobs, out, n_jobs=None, cache_dir=None, log=None):
+    """Run the jobs not yet in `out`, appending results as they complete"""
+    done = {job_id(r) for r in load(out)}
+    todo = [job for job in jobs if job_id(job) not in done]
+    if not todo:
+        return
+    # Drop a line truncated by an interruption before appending
+    if os.path.exists(out):
+        with open(out, "rb+") as f:
+            data = f.read()
+            f.truncate(data.rfind(b"\n") + 1)
+    with open(out, "a") as f, ProcessPoolExecutor(n_jobs) as pool:
+        futures = [pool.submit(measure, job, cache_dir) for job in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            if log:
+                print(f"[{i}/{len(todo)}] {job_id(result)}", file=log)
+
+
+def markdown(results):
+    """Table of the results, sorted by parameters and gas"""
+    lines = [
+        "| Params | t | a | Implementation | Options | Rules | CodeSize (B) | GasCost | N-ops |",
+        "|:-------|:-:|:-:|:---------------|:--------|:------|:------------:|:-------:|:-----:|",
+    ]
+
+    def key(r):
+        return (r["params"], r["size"], r["sbox"], r.get("gas", float("inf")),
+                r["implementation"])
+
+    for r in sorted(results, key=key):
+        options = ", ".join(k for k, v in r["options"].items() if v) or "-"
+        rules = ("all" if r["rules"] == list(all_rules)
+                 else ", ".join(r["rules"]) or "-")
+        head = (f"| {Path(r['params']).stem} | {r['size']} | {r['sbox']} "
+                f"| {r['implementation']} | {options} | {rules} ")
+        if "error" in r:
+            lines.append(head + f"| {r['error']} | | |")
+            continue
+        mark = "" if r["deployable"] else "*"
+        lines.append(head + f"| {fmt(r['code_size'])}{mark} "
+                     f"| {fmt(r['gas'])} | {fmt(r['n_ops'])} |")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--params", nargs="*", default=[],
+                        help="JSON or binary parameter files")
+    parser.add_argument("--prime", type=lambda x: int(x, 0),
+                        help="generate parameters for this field")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[3])
+    parser.add_argument("--alphas", type=int, nargs="*", default=[5])
+    parser.add_argument("--variants", nargs="*", default=None)
+    parser.add_argument("--options", nargs="*", default=[],
+                        help="generator options tried off and on, "
+                             "e.g. sparse absorb")
+    parser.add_argument("--rules", action="store_true",
+                        help="also run with all optimizer rules")
+    parser.add_argument("--out", default="sweep.jsonl")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--markdown", action="store_true",
+                        help="print the table of all results in --out")
+    args = parser.parse_args(argv)
+
+    param_files = list(args.params)
+    if args.prime is not None:
+        for size, alpha in itertools.product(args.sizes, args.alphas):
+            param_files.append(paramgen.cached(args.prime, size, alpha))
+    if not param_files:
+        param_files = ["params/sw2mont.json"]
+    names = args.variants or [k for k, v in variants.items() if v is not None]
+    rules = [()]
+    if args.rules:
+        rules.append(all_rules)
+    jobs = combinations(param_files, names, args.options, rules)
+
+    cache_dir = None if args.no_cache else BuildCache().path
+    run(jobs, args.out, args.jobs, cache_dir, log=sys.stderr)
+    if args.markdown:
+        results = {job_id(r): r for r in load(args.out)}
+        print(markdown([results[job_id(j)] for j in jobs]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
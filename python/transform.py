@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+from .evm.types import Hex
+
+
+def _inverse(m, p):
+    """Inverse of the square matrix m modulo p, by Gauss-Jordan elimination"""
+    n = len(m)
+    a = [[x % p for x in row] + [int(i == j) for j in range(n)]
+         for i, row in enumerate(m)]
+    for c in range(n):
+        pivot = next((i for i in range(c, n) if a[i][c]), None)
+        if pivot is None:
+            raise ValueError("Matrix is not invertible")
+        a[c], a[pivot] = a[pivot], a[c]
+        inv = pow(a[c][c], -1, p)
+        a[c] = [x * inv % p for x in a[c]]
+        for i in range(n):
+            if i != c and a[i][c]:
+                f = a[i][c]
+                a[i] = [(x - f * y) % p for x, y in zip(a[i], a[c])]
+    return [row[n:] for row in a]
+
+
+@dataclass
+class SparseRounds:
+    """Partial rounds rewritten with sparse matrices
+
+    The first partial round keeps a dense matrix, `first`. Each following
+    round r mixes with the sparse matrix of first row `rows[r]` and first
+    column (below the diagonal) `cols[r]`, the identity elsewhere:
+        s[0] = sum(rows[r][k] * t[k]), s[j] = cols[r][j - 1] * t[0] + t[j]
+    `rks[r]` are the constants of round r; rows[0] and cols[0] are None.
+    """
+    first: list
+    rks: list
+    rows: list
+    cols: list
+
+
+def sparse_partial_rounds(params, montgomery=False) -> SparseRounds:
+    """Factor the MDS matrix of the partial rounds, as in the Poseidon paper
+
+    The MDS matrix M is written A.B, with A sparse and B = diag(1, M^),
+    which leaves lane 0 and hence the S-box alone. B moves back through the
+    previous round, into its constants and matrix, where the factorization
+    repeats. Values are returned in the form of params: in Montgomery form
+    if `montgomery`, as EVMMAX generators consume them.
+    """
+    p = int(params["modulus"])
+    size = params["size"]
+    lim_full = params["n_full_rounds"] // 2
+    lim_partial = lim_full + params["n_partial_rounds"]
+
+    rinv = int(params["montRinv"]) if montgomery else 1
+    mds = [[int(x) * rinv % p for x in row] for row in params["mds"]]
+    rks = [[int(x) * rinv % p for x in row]
+           for row in params["rks"][lim_full:lim_partial]]
+
+    n = len(rks)
+    rows, cols = [None] * n, [None] * n
+    m = mds
+    for r in reversed(range(1, n)):
+        hat = [row[1:] for row in m[1:]]
+        hat_inv = _inverse(hat, p)
+        rows[r] = [m[0][0]] + [
+            sum(m[0][1 + k] * hat_inv[k][j] for k in range(size - 1)) % p
+            for j in range(size - 1)]
+        cols[r] = [m[j][0] for j in range(1, size)]
+        # B.c and B.M, for round r - 1
+        rks[r] = [rks[r][0]] + [
+            sum(hat[j][k] * rks[r][1 + k] for k in range(size - 1)) % p
+            for j in range(size - 1)]
+        m = [mds[0]] + [
+            [sum(hat[j][k] * mds[1 + k][i] for k in range(size - 1)) % p
+             for i in range(size)]
+            for j in range(size - 1)]
+
+    r = int(params["montR"]) if montgomery else 1
+
+    def convert(v):
+        return v if v is None else [Hex(x * r % p) for x in v]
+
+    return SparseRounds(
+        first=[convert(row) for row in m],
+        rks=[convert(v) for v in rks],
+        rows=[convert(v) for v in rows],
+        cols=[convert(v) for v in cols],
+    )
+
+
+def absorb_constants(params, montgomery=False, sparse=None) -> list:
+    """Round constants with those of partial rounds reduced to a scalar
+
+    Constants of lanes without S-box go through the partial round linearly:
+    M.S(x + c) = M.S(x + c[0]) + M.(0, c[1], ...), so they move forward to
+    the next round. Partial rounds are left with their lane 0 constant and
+    zeros, except the last round of the permutation if it is partial. With
+    `sparse`, partial rounds use its matrices and constants.
+
+    Returns the constants of all rounds, in the form of params.
+    """
+    p = int(params["modulus"])
+    size = params["size"]
+    lim_full = params["n_full_rounds"] // 2
+    lim_partial = lim_full + params["n_partial_rounds"]
+    rinv = int(params["montRinv"]) if montgomery else 1
+
+    def canonical(m):
+        return [[int(x) * rinv % p for x in row] for row in m]
+
+    rks = canonical(params["rks"])
+    mds = canonical(params["mds"])
+    if sparse is not None:
+        rks[lim_full:lim_partial] = canonical(sparse.rks)
+
+    for r in range(lim_full, min(lim_partial, len(rks) - 1)):
+        m = mds
+        if sparse is not None:
+            i = r - lim_full
+            if i == 0:
+                m = canonical(sparse.first)
+            else:
+                row, col = canonical([sparse.rows[i], sparse.cols[i]])
+                m = [row] + [[col[j - 1]] + [int(j == k)
+                                             for k in range(1, size)]
+                             for j in range(1, size)]
+        carry = [sum(m[j][k] * rks[r][k] for k in range(1, size))
+                 for j in range(size)]
+        rks[r + 1] = [(x + y) % p for x, y in zip(rks[r + 1], carry)]
+        rks[r][1:] = [0] * (size - 1)
+
+    r = int(params["montR"]) if montgomery else 1
+    return [[Hex(x * r % p) for x in row] for row in rks]
@@ -0,0 +1,39 @@
+import itertools
+from pathlib import Path
+
+import pytest
+
+from python.autotune import knobs
+from python.benchmark import variants
+from python.params import load_parameters
+
+ROOT = Path(__file__).parent.parent
+
+
+def settings(names=None):
+    """Every variant with every combination of its knobs"""
+    for name, generator in variants.items():
+        if generator is None or names and name not in names:
+            continue
+        k = knobs(generator)
+        for values in itertools.product(*k.values()):
+            yield name, dict(zip(k, values))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "variants(*names): restrict `setting` to these variants")
+
+
+def pytest_generate_tests(metafunc):
+    if "setting" in metafunc.fixturenames:
+        marker = metafunc.definition.get_closest_marker("variants")
+        cases = list(settings(marker.args if marker else None))
+        metafunc.parametrize("setting", cases, ids=[
+            "-".join([name, *(f"{k}={v}" for k, v in options.items())])
+            for name, options in cases])
+
+
+@pytest.fixture(scope="session")
+def params():
+    return load_parameters(ROOT / "params/sw2mont.json")
@@ -0,0 +1,27 @@
+import math
+
+from python.autotune import candidates, knobs, tune
+from python.benchmark import calldata, variants
+from python.evm import Interpreter
+
+
+def test_tune_picks_the_lowest_gas_within_budget(params):
+    best, b, gas = tune(params, budget=8000,
+                        names=["max-unwind", "max-func"])
+    assert best.implementation == "max-func"
+    assert b.code_size <= 8000
+    assert Interpreter(b.code).run(calldata(params)).gas == gas
+    unoptimized = tune(params, budget=8000, names=["max-func"],
+                       peephole=(False,))
+    assert gas <= unoptimized[2]
+
+
+def test_tune_returns_none_when_nothing_fits(params):
+    assert tune(params, budget=100, names=["max-func"]) is None
+
+
+def test_candidates_cover_knobs():
+    k = knobs(variants["max-func"])
+    options = [c.options for c in candidates(["max-func"], (False,))]
+    assert len(options) == math.prod(len(v) for v in k.values())
+    assert all(o.keys() == k.keys() for o in options)
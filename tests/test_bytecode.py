@@ -0,0 +1,49 @@
+import pytest
+
+from python.benchmark import variants
+from python.evm import Program, bytecode
+from python.evm.types import Label
+
+
+@pytest.mark.parametrize("name", [k for k, v in variants.items() if v])
+def test_assemble_disassemble_round_trip(params, name):
+    program = variants[name](params)
+    code = program.assemble()
+    ops = [op for _, op in bytecode.disassemble(code)]
+    assert bytecode.assemble(ops) == code
+    assert ([(op.name, op.arg) for op in ops]
+            == [(op.name, op.arg) for op in bytecode.link(program.ops)])
+
+
+def test_disassemble_pads_truncated_push():
+    (pc, op), = bytecode.disassemble(bytes.fromhex("61ab"))
+    assert (pc, op.name, op.arg) == (0, "PUSH2", 0xab00)
+
+
+def test_link_widens_pushes_past_one_byte():
+    seg = Program().segment("main")
+    end = Label("end")
+    seg.jump(end)
+    for _ in range(300):
+        seg.jumpdest()
+    seg.jumpdest(end)
+    ops = bytecode.link(seg.ops)
+    assert ops[0].name == "PUSH2"
+    assert ops[0].arg == len(bytecode.assemble(seg.ops)) - 1
+
+
+def test_link_rejects_undefined_label():
+    seg = Program().segment("main")
+    seg.jump(Label("end"))
+    with pytest.raises(ValueError, match="not defined"):
+        bytecode.link(seg.ops)
+
+
+def test_link_rejects_label_defined_twice():
+    seg = Program().segment("main")
+    end = Label("end")
+    seg.jump(end)
+    seg.jumpdest(end)
+    seg.jumpdest(end)
+    with pytest.raises(ValueError, match="defined twice"):
+        bytecode.link(seg.ops)
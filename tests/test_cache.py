@@ -0,0 +1,51 @@
+import os
+
+from python.benchmark import variants
+from python.cache import BuildCache, build, build_key
+from python.evm.optimizer import rules
+
+
+def test_build_key_covers_options_and_rules(params):
+    generator = variants["max-func"]
+    keys = {build_key(generator, params),
+            build_key(generator, params, absorb=False),
+            build_key(generator, params, rules),
+            build_key(variants["max-unwind"], params)}
+    assert len(keys) == 4
+    assert build_key(generator, params) == build_key(generator, params)
+
+
+def test_cache_hit_returns_the_build(params, tmp_path):
+    cache = BuildCache(tmp_path)
+    generator = variants["std-mem-func"]
+    fresh = build(generator, params, rules, cache, absorb=False)
+    key = build_key(generator, params, rules, absorb=False)
+    assert cache.get(key) == fresh
+    assert build(generator, params, rules, cache, absorb=False) == fresh
+    assert fresh.code == build(generator, params, rules, absorb=False).code
+    assert fresh.optimized
+
+
+def test_cache_ignores_incomplete_entries(params, tmp_path):
+    cache = BuildCache(tmp_path)
+    generator = variants["max-func"]
+    build(generator, params, cache=cache)
+    key = build_key(generator, params)
+    code = tmp_path / f"{key}.bin"
+    code.write_bytes(code.read_bytes()[:-1])
+    assert cache.get(key) is None
+
+
+def test_cache_evicts_least_recently_used(params, tmp_path):
+    cache = BuildCache(tmp_path)
+    generator = variants["max-func"]
+    old = build_key(generator, params)
+    new = build_key(generator, params, absorb=False)
+    build(generator, params, cache=cache)
+    for path in tmp_path.glob(f"{old}.*"):
+        os.utime(path, (0, 0))
+    build(generator, params, cache=cache, absorb=False)
+    size = sum(path.stat().st_size for path in tmp_path.glob(f"{new}.*"))
+    BuildCache(tmp_path, max_bytes=size).evict()
+    assert cache.get(old) is None
+    assert cache.get(new) is not None
@@ -0,0 +1,32 @@
+import pytest
+
+from python.benchmark import calldata, variants
+from python.evm import Interpreter, gas
+from python.evm.ops import ops
+
+
+def test_estimate_matches_interpreter(params, setting):
+    name, options = setting
+    program = variants[name](params, **options)
+    report = gas.estimate(program)
+    result = Interpreter(program.assemble()).run(calldata(params))
+    assert report.total == result.gas
+
+
+def test_estimate_rejects_runtime_conditions(params):
+    program = variants["max-func"](params, batch=True)
+    with pytest.raises(ValueError):
+        gas.estimate(program)
+
+
+def test_default_schedule_matches_op_table():
+    schedule = gas.build_schedule()
+    assert all(schedule[op.name] == op.gas for op in ops)
+
+
+@pytest.mark.parametrize("evmmax", gas.evmmax_pricing)
+def test_evmmax_prices_grow_with_limbs(evmmax):
+    small = gas.build_schedule(evmmax=evmmax, limbs=4)
+    large = gas.build_schedule(evmmax=evmmax, limbs=12)
+    assert all(small[name] <= large[name] for name in gas.EVMMAX_OPS)
+    assert small["MULMONTX"] < large["MULMONTX"]
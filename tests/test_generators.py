@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from python.benchmark import variants
+from python.evm import Interpreter
+from python.reference import Poseidon
+
+
+def reference(params, name):
+    # The parameters are in Montgomery form, as EVMMAX consumes them; the
+    # std variants take them as is
+    return Poseidon(params, montgomery=name.startswith("max"))
+
+
+def words(values):
+    return b"".join(x.to_bytes(32, "big") for x in values)
+
+
+def values(data):
+    return [int.from_bytes(data[i:i + 32], "big")
+            for i in range(0, len(data), 32)]
+
+
+def run(params, name, data, **options):
+    return Interpreter(variants[name](params, **options).assemble()).run(data)
+
+
+def test_hash_matches_reference(params, setting):
+    name, options = setting
+    rng = random.Random(name)
+    inputs = [rng.randrange(int(params["modulus"]))
+              for _ in range(params["rate"])]
+    result = run(params, name, words(inputs), **options)
+    assert not result.reverted
+    assert values(result.output) == reference(params, name).hash(inputs)
+
+
+@pytest.mark.parametrize("name", ["std-mem-func", "max-func"])
+@pytest.mark.parametrize("absorb", [False, True])
+@pytest.mark.parametrize("rounds_per_call", [1, 4])
+def test_sparse_matches_reference(params, name, absorb, rounds_per_call):
+    inputs = list(range(1, params["rate"] + 1))
+    result = run(params, name, words(inputs), sparse=True, absorb=absorb,
+                 rounds_per_call=rounds_per_call)
+    assert values(result.output) == reference(params, name).hash(inputs)
+
+
+@pytest.mark.variants("std-mem-func", "max-func")
+def test_batch_matches_reference(params, setting):
+    name, options = setting
+    rng = random.Random(name)
+    inputs = [[rng.randrange(int(params["modulus"]))
+               for _ in range(params["rate"])] for _ in range(3)]
+    result = run(params, name, words(sum(inputs, [])), batch=True, **options)
+    assert values(result.output) == sum(
+        map(reference(params, name).hash, inputs), [])
+
+
+@pytest.mark.parametrize("name", ["std-mem-func", "max-func"])
+@pytest.mark.parametrize("blocks,extra", [(0, 0), (0, 32), (1, 1), (1, 32)])
+def test_batch_reverts_on_partial_input(params, name, blocks, extra):
+    size = 32 * params["rate"] * blocks + extra
+    assert run(params, name, b"\x01" * size, batch=True).reverted
+
+
+@pytest.mark.parametrize("name", ["std-mem-func", "max-func"])
+@pytest.mark.parametrize("absorb", [False, True])
+def test_variable_length_matches_reference(params, name, absorb):
+    rng = random.Random(name)
+    for n in range(2 * params["rate"] + 2):
+        message = [rng.randrange(int(params["modulus"])) for _ in range(n)]
+        result = run(params, name, words(message), variable_length=True,
+                     absorb=absorb)
+        assert values(result.output) == reference(
+            params, name).hash_message(message)
+
+
+@pytest.mark.parametrize("name", ["std-mem-func", "max-func"])
+def test_variable_length_rejects_partial_words(params, name):
+    # Zero-filled, 01..1f would hash as 01..1f00
+    message = bytes(range(1, 32))
+    assert run(params, name, message, variable_length=True).reverted
+    padded = run(params, name, message + b"\x00", variable_length=True)
+    assert not padded.reverted
+    assert values(padded.output) == reference(params, name).hash_message(
+        values(message + b"\x00"))
+
+
+def test_variable_length_excludes_batch(params):
+    with pytest.raises(ValueError):
+        variants["std-mem-func"](params, batch=True, variable_length=True)
+
+
+@pytest.mark.parametrize("rounds_per_call", [1, 8])
+def test_merkle_root_matches_reference(params, rounds_per_call):
+    rng = random.Random(rounds_per_call)
+    for depth in (1, 2, 3):
+        leaves = [rng.randrange(int(params["modulus"]))
+                  for _ in range(params["rate"] ** depth)]
+        result = run(params, "max-func", words(leaves), merkle=True,
+                     rounds_per_call=rounds_per_call)
+        assert values(result.output) == [
+            reference(params, "max-func").merkle_root(leaves)]
+
+
+def test_merkle_rejects_leaf_counts(params):
+    rate = params["rate"]
+    for n in (0, 1, rate + 1, rate ** 2 + rate):
+        leaves = list(range(1, n + 1))
+        assert run(params, "max-func", words(leaves), merkle=True).reverted
+        with pytest.raises(ValueError):
+            reference(params, "max-func").merkle_root(leaves)
+
+
+def test_merkle_needs_rate_two(params):
+    with pytest.raises(ValueError, match="rate"):
+        variants["max-func"](dict(params, rate=1), merkle=True)
+
+
+def test_merkle_excludes_batch(params):
+    with pytest.raises(ValueError):
+        variants["max-func"](params, batch=True, merkle=True)
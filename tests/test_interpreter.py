@@ -0,0 +1,22 @@
+import pytest
+
+from python.evm import Interpreter
+from python.evm.interpreter import ExecutionError
+
+
+def test_mstore_charges_memory():
+    # PUSH1 1 PUSH1 0 MSTORE
+    assert Interpreter("6001600052").run().gas == 3 + 3 + 3 + 3
+
+
+def test_huge_offset_runs_out_of_gas():
+    # PUSH1 1 PUSH5 2**39 MSTORE
+    code = "6001" + "64" + (1 << 39).to_bytes(5, "big").hex() + "52"
+    with pytest.raises(ExecutionError, match="Out of gas"):
+        Interpreter(code).run(gas_limit=30_000_000)
+
+
+def test_unsupported_op_halts():
+    # PUSH1 0 SLOAD
+    with pytest.raises(ExecutionError, match="SLOAD"):
+        Interpreter("600054").run()
@@ -0,0 +1,20 @@
+import pytest
+
+from python import poseidonmax
+from python.layout import round_groups
+
+
+@pytest.mark.parametrize("start,stop,k", [(0, 4, 1), (4, 61, 8), (3, 5, 4)])
+def test_round_groups_cover_rounds(start, stop, k):
+    groups = round_groups(start, stop, k)
+    assert [r for _, rounds in groups for r in rounds] == list(range(start,
+                                                                      stop))
+    for entry, rounds in groups:
+        assert entry + len(rounds) == k
+
+
+@pytest.mark.parametrize("options", [{"rounds_per_call": 83},
+                                     {"rounds_per_call": 32, "sparse": True}])
+def test_rounds_per_call_over_slot_budget(params, options):
+    with pytest.raises(ValueError, match="rounds_per_call"):
+        poseidonmax.program(params, **options)
@@ -0,0 +1,37 @@
+import pytest
+
+from python.benchmark import calldata, variants
+from python.evm import Interpreter, Program, gas
+from python.evm.optimizer import optimize, rules
+
+
+@pytest.fixture(scope="module")
+def savings(params):
+    saved = {}
+    for name, generator in variants.items():
+        if generator is None:
+            continue
+        program = generator(params)
+        before = Interpreter(program.assemble()).run(calldata(params))
+        stats = optimize(program)
+        after = Interpreter(program.assemble()).run(calldata(params))
+        assert after.output == before.output, name
+        assert gas.estimate(program).total == after.gas < before.gas
+        for rule, s in stats.items():
+            saved[rule] = max(saved.get(rule, 0), s.gas)
+    return saved
+
+
+@pytest.mark.parametrize("rule", rules)
+def test_rule_saves_gas(savings, rule):
+    assert savings.get(rule, 0) > 0
+
+
+def test_rejects_unlabelled_jumpdests():
+    program = Program()
+    seg = program.segment("main")
+    seg.jump(3)
+    seg.jumpdest()
+    program.ops.extend(seg.ops)
+    with pytest.raises(ValueError, match="jump targets"):
+        optimize(program)
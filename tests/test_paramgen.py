@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+from python.benchmark import calldata, variants
+from python.evm import Interpreter
+from python.paramgen import cached, generate
+from python.params import load_parameters
+from python.reference import Poseidon
+
+BN254 = 0x30644e72e131a029b85045b68181585d2833e84879b9709143e1f593f0000001
+
+
+def test_generate_rejects_non_permutation_sbox():
+    with pytest.raises(ValueError, match="permutation"):
+        generate(BN254, 3, 3)
+
+
+def test_generated_params_hash_as_reference(tmp_path):
+    path = cached(BN254, 3, 5, cache_dir=tmp_path)
+    assert cached(BN254, 3, 5, cache_dir=tmp_path) == path
+    with open(path) as f:
+        assert json.load(f) == generate(BN254, 3, 5)
+    params = load_parameters(path)
+    for name in ("std-mem-func", "max-func"):
+        ref = Poseidon(params, montgomery=name.startswith("max"))
+        inputs = list(range(1, params["rate"] + 1))
+        result = Interpreter(variants[name](params).assemble()).run(
+            calldata(params))
+        out = [int.from_bytes(result.output[i:i + 32], "big")
+               for i in range(0, len(result.output), 32)]
+        assert out == ref.hash(inputs)
@@ -0,0 +1,46 @@
+import pytest
+
+from python.benchmark import variants
+from python.paramgen import cached
+from python.params import (export_parameters_binary, import_parameters,
+                           load_parameters)
+
+BN254 = 0x30644e72e131a029b85045b68181585d2833e84879b9709143e1f593f0000001
+
+
+def plain(params):
+    return {k: [[int(x) for x in row] for row in v] if k in ("mds", "rks")
+            else int(v) for k, v in params.items()}
+
+
+def export(params, path, byteorder="big"):
+    with open(path, "wb") as f:
+        export_parameters_binary(params, f, byteorder)
+    return path
+
+
+@pytest.mark.parametrize("byteorder", ["big", "little"])
+def test_binary_round_trip(params, tmp_path, byteorder):
+    path = export(params, tmp_path / "params.bin", byteorder)
+    assert plain(load_parameters(path)) == plain(params)
+
+
+def test_binary_params_build_the_same_code(params, tmp_path):
+    binary = load_parameters(export(params, tmp_path / "params.bin"))
+    for name in ("std-mem-unwind", "max-func"):
+        assert (variants[name](binary).assemble()
+                == variants[name](params).assemble())
+
+
+def test_binary_rejects_truncated_file(params, tmp_path):
+    path = export(params, tmp_path / "params.bin")
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        load_parameters(path)
+
+
+def test_cached_binary_matches_json(tmp_path):
+    binary = load_parameters(cached(BN254, 3, 5, cache_dir=tmp_path,
+                                    binary=True))
+    with open(cached(BN254, 3, 5, cache_dir=tmp_path)) as f:
+        assert plain(binary) == plain(import_parameters(f))
@@ -0,0 +1,20 @@
+from python.evm import Program, bytecode
+from python.evm.types import Label
+
+
+def test_segment_size_tracks_its_ops():
+    seg = Program().segment("main")
+    seg.push(1)
+    seg.push(0x1234)
+    seg.mstore(0x40)
+    assert len(seg) == len(bytecode.assemble(seg.ops))
+
+
+def test_segment_size_bounds_label_pushes():
+    seg = Program().segment("main")
+    end = Label("end")
+    seg.jump(end)
+    seg.jumpdest(end)
+    # PUSH2 counted, PUSH1 once linked
+    assert len(seg) == 5
+    assert len(bytecode.assemble(seg.ops)) == 4
@@ -0,0 +1,22 @@
+import pytest
+
+from python.reference import Poseidon
+
+
+def test_hash_rejects_input_count(params):
+    ref = Poseidon(params)
+    with pytest.raises(ValueError):
+        ref.hash(list(range(params["rate"] + 1)))
+
+
+def test_canonical_and_montgomery_permutations_agree(params):
+    ref = Poseidon(params)
+    state = list(range(1, params["size"] + 1))
+    mont = ref.permute_mont([ref.to_mont(x) for x in state])
+    assert [ref.from_mont(x) for x in mont] == ref.permute(state)
+
+
+def test_merkle_root_rejects_rate_one(params):
+    ref = Poseidon(dict(params, rate=1))
+    with pytest.raises(ValueError, match="rate"):
+        ref.merkle_root([1])
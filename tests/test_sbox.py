@@ -0,0 +1,20 @@
+import pytest
+
+from python.sbox import SEARCH_LIMIT, addition_chain, n_scratch
+
+
+@pytest.mark.parametrize("n,length", [(2, 1), (3, 2), (5, 3), (7, 4),
+                                      (17, 5), (255, 11)])
+def test_addition_chain_length(n, length):
+    assert len(addition_chain(n)) == length
+
+
+@pytest.mark.parametrize("n", [3, 5, 7, 11, 255, SEARCH_LIMIT + 1, 2 ** 64 - 59])
+def test_addition_chain_is_valid(n):
+    steps = addition_chain(n)
+    values = [1]
+    for k, (i, j) in enumerate(steps, 1):
+        assert i < k and j < k
+        values.append(values[i] + values[j])
+    assert values[-1] == n
+    assert n_scratch(steps) <= len(steps)
@@ -0,0 +1,16 @@
+from python.benchmark import accepts, variants
+from python.sweep import combinations
+
+
+def test_accepts():
+    assert accepts(variants["max-func"], "merkle")
+    assert not accepts(variants["max-unwind"], "merkle")
+    assert not accepts(variants["rs"], "sparse")
+
+
+def test_combinations_try_accepted_options():
+    jobs = combinations(["p.json"], ["max-unwind", "max-func"],
+                        ["sparse", "absorb"])
+    options = [job["options"] for job in jobs]
+    assert options[:2] == [{"sparse": False}, {"sparse": True}]
+    assert len(options) == 2 + 4
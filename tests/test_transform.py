@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from python.reference import Poseidon
+from python.transform import absorb_constants, sparse_partial_rounds
+
+
+def limits(params):
+    lim_full = params["n_full_rounds"] // 2
+    return lim_full, lim_full + params["n_partial_rounds"]
+
+
+def permute(params, state, rks, matrices):
+    """Permutation with the constants and matrix of each round"""
+    p, size = int(params["modulus"]), params["size"]
+    lim_full, lim_partial = limits(params)
+    for r, (rk, m) in enumerate(zip(rks, matrices)):
+        n_sbox = size if r < lim_full or r >= lim_partial else 1
+        t = [(x + c) % p for x, c in zip(state, rk)]
+        t[:n_sbox] = [pow(x, params["sbox"], p) for x in t[:n_sbox]]
+        state = [sum(a * b for a, b in zip(row, t)) % p for row in m]
+    return state
+
+
+def sparse_matrices(params, sp, canonical):
+    size = params["size"]
+    matrices = [canonical(sp.first)]
+    for row, col in zip(sp.rows[1:], sp.cols[1:]):
+        row, col = canonical([row, col])
+        matrices.append([row] + [[col[j - 1]] + [int(j == k)
+                                                 for k in range(1, size)]
+                                 for j in range(1, size)])
+    return matrices
+
+
+def transformed(params, montgomery, sparse):
+    """Reference, canonical form, round constants and matrices"""
+    ref = Poseidon(params, montgomery=montgomery)
+    rinv = ref.montRinv if montgomery else 1
+
+    def canonical(m):
+        return [[int(x) * rinv % ref.modulus for x in row] for row in m]
+
+    lim_full, lim_partial = limits(params)
+    rks = ref.rks
+    matrices = [ref.mds] * len(rks)
+    sp = None
+    if sparse:
+        sp = sparse_partial_rounds(params, montgomery=montgomery)
+        rks = rks[:lim_full] + canonical(sp.rks) + rks[lim_partial:]
+        matrices[lim_full:lim_partial] = sparse_matrices(params, sp,
+                                                         canonical)
+    return ref, canonical, sp, rks, matrices
+
+
+def check(params, ref, rks, matrices):
+    rng = random.Random(0)
+    state = [rng.randrange(ref.modulus) for _ in range(params["size"])]
+    assert permute(params, state, rks, matrices) == ref.permute(list(state))
+
+
+@pytest.mark.parametrize("montgomery", [False, True])
+def test_sparse_rounds_keep_the_permutation(params, montgomery):
+    ref, _, _, rks, matrices = transformed(params, montgomery, True)
+    check(params, ref, rks, matrices)
+
+
+@pytest.mark.parametrize("montgomery", [False, True])
+@pytest.mark.parametrize("sparse", [False, True])
+def test_absorbed_constants_keep_the_permutation(params, montgomery, sparse):
+    ref, canonical, sp, _, matrices = transformed(params, montgomery, sparse)
+    rks = canonical(absorb_constants(params, montgomery=montgomery,
+                                     sparse=sp))
+    lim_full, lim_partial = limits(params)
+    # Partial rounds keep their lane 0 constant only
+    assert all(not any(rk[1:]) for rk in rks[lim_full:lim_partial])
+    check(params, ref, rks, matrices)
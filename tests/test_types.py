@@ -0,0 +1,26 @@
+import pytest
+
+from python.evm import Hex
+
+
+@pytest.mark.parametrize("value,nbytes", [(0, 1), (0xff, 1), (0x100, 2),
+                                          (1 << 255, 32), (-1, 0)])
+def test_nbytes(value, nbytes):
+    assert Hex(value).nbytes() == nbytes
+
+
+def test_hex_formatting():
+    assert str(Hex(0x1ab)) == "01ab"
+    assert str(Hex(-1)) == ""
+    assert Hex(0xab).to_hex(2) == "00ab"
+    assert Hex("01ab") == 0x1ab
+
+
+def test_to_le():
+    assert Hex(0x0102).to_le() == 0x0201
+    assert Hex(0x01).to_le(4) == 0x01000000
+
+
+def test_arithmetic_returns_ints():
+    assert Hex(3) * 2 == 2 * Hex(3) == 6
+    assert type(Hex(3) + 1) is int